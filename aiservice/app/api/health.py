@@ -4,6 +4,7 @@ Health check and status endpoints
 
 from fastapi import APIRouter
 from app.utils.data_store import get_ingested_data
+from app.utils.cache import get_cache_stats
 
 router = APIRouter()
 
@@ -39,7 +40,8 @@ async def get_ingestion_status():
         "data_ingested": len(ingested_data["transactions"]) > 0,
         "transactions_count": len(ingested_data["transactions"]),
         "last_updated": ingested_data["last_updated"],
-        "vectorstore_ready": ingested_data["vectorstore"] is not None
+        "vectorstore_ready": ingested_data["vectorstore"] is not None,
+        "query_cache": get_cache_stats()
     }
 
 
@@ -50,7 +52,7 @@ async def test_connection():
         return {"status": "error", "error": "LLM not initialized"}
 
     try:
-        response = llm.invoke("Say 'OK' if you're working")
+        response = await llm.ainvoke("Say 'OK' if you're working")
         return {"status": "success", "response": response.content}
     except Exception as e:
         return {"status": "error", "error": str(e)}
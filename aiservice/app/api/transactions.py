@@ -2,22 +2,32 @@
 Transaction query endpoints
 """
 
-import re
+import heapq
 import logging
+from operator import itemgetter
+from typing import List, Dict, Any, Tuple, Optional, Iterator, Union
+
+import orjson
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 
 from app.models.schemas import (
     RAGRequest,
     IngestRequest,
     IngestResponse,
     PromptRequest,
-    RAGResponse
+    RAGResponse,
+    TransactionData,
+    TransactionList
+)
+from app.utils.data_store import (
+    get_ingested_data,
+    set_ingested_data,
+    has_ingested_data,
+    prepare_transactions
 )
-from app.services.rag_service import RAGService
-from app.utils.data_store import get_ingested_data, set_ingested_data, has_ingested_data
 from app.utils.formatters import format_transaction_for_api
-from app.utils.filters import extract_filters_from_query, apply_filters
-from app.utils.query_mode import detect_query_mode
 from app.utils.cache import generate_query_id, get_cached_query, cache_query_results
 
 logger = logging.getLogger(__name__)
@@ -27,13 +37,161 @@ router = APIRouter()
 # Global references to models (will be set by main app)
 embeddings_model = None
 llm = None
+_rag_service = None
 
 
 def set_models(emb_model, llm_model):
     """Set global model references"""
-    global embeddings_model, llm
+    global embeddings_model, llm, _rag_service
     embeddings_model = emb_model
     llm = llm_model
+    _rag_service = None
+
+
+def get_rag_service():
+    """
+    Shared RAGService for the current models
+    Built on first use so langchain/FAISS load on the first query rather than at worker start
+    """
+    global _rag_service
+    if _rag_service is None:
+        from app.services.rag_service import RAGService
+        _rag_service = RAGService(embeddings_model, llm)
+    return _rag_service
+
+
+def _to_documents(transactions: List[TransactionData]) -> List[Dict]:
+    """
+    Dump validated transactions to plain dicts keyed by canonical field names
+    This is the one normalization pass: aliases (accountNumber, balance, txnMode, txnRef)
+    are resolved here, so downstream code looks up only the canonical key
+    Unset fields are dropped so downstream .get() defaults still apply
+    """
+    return TransactionList.dump_python(transactions, exclude_none=True)
+
+
+def _prepare_query_data(rag_service, transactions: List[TransactionData]) -> Tuple[List[Dict], Any, List]:
+    """Documents and vector store for /query context data (CPU-bound: run it in the threadpool)"""
+    documents = prepare_transactions(_to_documents(transactions))
+    logger.info("Creating vector store...")
+    vectorstore, langchain_docs = rag_service.create_vector_store(documents)
+    return documents, vectorstore, langchain_docs
+
+
+def _ingest(rag_service, transactions: List[TransactionData]):
+    """
+    Build (or load) the vector store and store it with the columnar view and parsed amounts
+    CPU-bound: run it in the threadpool
+    """
+    documents = _to_documents(transactions)
+
+    # Create vector store (or load the saved one for identical data)
+    vectorstore, langchain_docs = rag_service.ingest_vector_store(documents)
+
+    # Store in global state
+    set_ingested_data(documents, vectorstore, langchain_docs)
+
+
+def _paginate(
+    docs: List[Dict],
+    page: int,
+    page_size: int,
+    presorted: bool = True
+) -> Tuple[List[Dict], Dict[str, Any]]:
+    """
+    Select one page of documents (highest amount first) and its pagination info
+    Unsorted input only selects the top page * page_size items instead of sorting everything
+    """
+    start_idx = (page - 1) * page_size
+    end_idx = start_idx + page_size
+    total_items = len(docs)
+
+    if presorted:
+        page_docs = docs[start_idx:end_idx]
+    else:
+        page_docs = heapq.nlargest(end_idx, docs, key=itemgetter("_amount_f"))[start_idx:]
+
+    pagination = {
+        "page": page,
+        "page_size": page_size,
+        "total_items": total_items,
+        "total_pages": (total_items + page_size - 1) // page_size,
+        "has_next": end_idx < total_items,
+        "has_prev": page > 1
+    }
+    return page_docs, pagination
+
+
+def _statistical_query(
+    rag_service,
+    documents: List[Dict],
+    prompt: str,
+    query_id: Optional[str] = None
+) -> Tuple[str, Dict[str, float], List[str], List[Dict]]:
+    """
+    STATISTICAL answer, cached under query_id when given
+    Runs in the threadpool, so caching (which sorts the matches) stays off the event loop
+    """
+    answer, stats, filter_desc, filtered_docs = rag_service.process_statistical_query(documents, prompt)
+    if query_id is not None:
+        cache_query_results(query_id, answer, "STATISTICAL", filtered_docs, filter_desc, stats)
+    return answer, stats, filter_desc, filtered_docs
+
+
+def _smart_full_query(
+    rag_service,
+    documents: List[Dict],
+    request: Union[RAGRequest, PromptRequest],
+    mode: str,
+    query_id: Optional[str] = None
+) -> Tuple[str, List[Dict], List[str], Optional[List[Dict]], Optional[Dict[str, Any]]]:
+    """
+    SMART_FULL answer and the requested page, cached under query_id when given
+    Runs in the threadpool, so sorting/selecting the page stays off the event loop
+    Returns: (answer, filtered_docs, filter_descriptions, page_docs, pagination)
+    """
+    answer, filtered_docs, filter_descriptions = rag_service.process_smart_full_query(
+        documents, request.prompt, request.show_all
+    )
+
+    if query_id is not None:
+        # Cache results (sorted once for all pages)
+        docs = cache_query_results(query_id, answer, mode, filtered_docs, filter_descriptions, None)["sorted_docs"]
+        presorted = True
+    else:
+        docs, presorted = filtered_docs, False
+
+    page_docs, pagination = None, None
+    if request.show_all and filtered_docs:
+        page_docs, pagination = _paginate(docs, request.page, request.page_size, presorted=presorted)
+
+    return answer, filtered_docs, filter_descriptions, page_docs, pagination
+
+
+def _stream_lines(response_data: Dict[str, Any], page_docs: List[Dict]) -> Iterator[bytes]:
+    """NDJSON body: answer header, one line per transaction, then pagination/statistics footer"""
+    header = {k: v for k, v in response_data.items() if k not in ("transactions", "pagination", "statistics")}
+    yield orjson.dumps(header) + b"\n"
+    for doc in page_docs:
+        yield orjson.dumps({"transaction": format_transaction_for_api(doc).model_dump()}) + b"\n"
+    yield orjson.dumps({
+        "pagination": response_data["pagination"],
+        "statistics": response_data["statistics"]
+    }) + b"\n"
+
+
+def _respond(
+    response_data: Dict[str, Any],
+    page_docs: Optional[List[Dict]],
+    stream: bool
+) -> Union[RAGResponse, StreamingResponse]:
+    """Build the query response, either as one JSON document or streamed as NDJSON"""
+    if stream:
+        return StreamingResponse(_stream_lines(response_data, page_docs or []), media_type="application/x-ndjson")
+
+    if page_docs is not None:
+        response_data["transactions"] = [format_transaction_for_api(doc) for doc in page_docs]
+    return RAGResponse(**response_data)
 
 
 @router.post("/query", response_model=RAGResponse)
@@ -51,26 +209,28 @@ async def query_transactions(request: RAGRequest):
     if not embeddings_model or not llm:
         raise HTTPException(status_code=503, detail="Models not initialized")
 
+    # Imported on first use: they pull in numba and the pattern tables, which worker start doesn't need
+    from app.utils.filters import extract_filters_from_query
+    from app.utils.query_mode import detect_query_mode, is_analytical_or_counting
+
     try:
         logger.info(f"Processing query: {request.prompt}")
+        prompt_lower = request.prompt.lower()
         logger.info(f"Context data: {len(request.context_data)} transactions")
 
-        # Initialize RAG service
-        rag_service = RAGService(embeddings_model, llm)
+        rag_service = get_rag_service()
 
-        # Prepare documents
-        documents = request.context_data
-
-        # Create vector store
-        logger.info("Creating vector store...")
-        vectorstore, langchain_docs = rag_service.create_vector_store(documents)
+        # Prepare documents and create vector store
+        documents, vectorstore, langchain_docs = await run_in_threadpool(
+            _prepare_query_data, rag_service, request.context_data
+        )
 
         # Extract filters
-        filters = extract_filters_from_query(request.prompt)
+        filters = extract_filters_from_query(request.prompt, prompt_lower)
         logger.info(f"Extracted filters: {filters}")
 
         # Detect query mode
-        mode = detect_query_mode(request.prompt, documents)
+        mode = detect_query_mode(request.prompt, documents, prompt_lower)
         if request.use_full_data is not None:
             mode = "SMART_FULL" if request.use_full_data else "VECTOR_SEARCH"
 
@@ -80,6 +240,7 @@ async def query_transactions(request: RAGRequest):
         query_id = generate_query_id(request.prompt, filters)
 
         # Prepare response
+        page_docs = None
         response_data = {
             "query_id": query_id,
             "mode": mode,
@@ -93,72 +254,42 @@ async def query_transactions(request: RAGRequest):
 
         # Process based on mode
         if mode == "STATISTICAL":
-            answer, stats, filter_desc, match_count = rag_service.process_statistical_query(
-                documents, request.prompt
+            answer, stats, filter_desc, filtered_docs = await run_in_threadpool(
+                _statistical_query, rag_service, documents, request.prompt
             )
             response_data["answer"] = answer
             response_data["statistics"] = stats
             response_data["filters_applied"] = filter_desc
-            response_data["matching_transactions_count"] = match_count
+            response_data["matching_transactions_count"] = len(filtered_docs)
 
         elif mode == "SMART_FULL" or request.use_full_data:
-            answer, filtered_docs, filter_descriptions = rag_service.process_smart_full_query(
-                documents, request.prompt, request.show_all
+            answer, filtered_docs, filter_descriptions, page_docs, pagination = await run_in_threadpool(
+                _smart_full_query, rag_service, documents, request, mode
             )
             response_data["matching_transactions_count"] = len(filtered_docs)
             response_data["filters_applied"] = filter_descriptions
             response_data["answer"] = answer
-
-            # Paginate results
-            if request.show_all and filtered_docs:
-                sorted_docs = sorted(filtered_docs, key=lambda x: float(x.get('amount', 0)), reverse=True)
-
-                start_idx = (request.page - 1) * request.page_size
-                end_idx = start_idx + request.page_size
-                paginated_docs = sorted_docs[start_idx:end_idx]
-
-                response_data["transactions"] = [
-                    format_transaction_for_api(doc) for doc in paginated_docs
-                ]
-                response_data["pagination"] = {
-                    "page": request.page,
-                    "page_size": request.page_size,
-                    "total_items": len(filtered_docs),
-                    "total_pages": (len(filtered_docs) + request.page_size - 1) // request.page_size,
-                    "has_next": end_idx < len(filtered_docs),
-                    "has_prev": request.page > 1
-                }
+            response_data["pagination"] = pagination
 
         else:
             # Vector search mode
             # Check if it's analytical or counting query
-            is_analytical = any(kw in request.prompt.lower() for kw in [
-                'summarize', 'summarise', 'summary', 'analyze', 'analyse',
-                'overview', 'insights', 'patterns', 'trends'
-            ])
-
-            counting_patterns = [
-                r'\b(how many|kitne|count|total)\s+.*?transaction',
-                r'transaction.*?\b(how many|kitne|count|total)',
-                r'\b(कितने|कितनी)\s+.*?(transaction|ट्रांज)',
-                r'(transaction|ट्रांज).*?\b(कितने|कितनी)',
-                r'\bnumber of\s+transaction',
-            ]
-            is_counting_query = any(re.search(pattern, request.prompt.lower()) for pattern in counting_patterns)
-            is_analytical = is_analytical or is_counting_query
+            is_analytical = is_analytical_or_counting(request.prompt, prompt_lower)
 
             if is_analytical:
-                result = rag_service.process_analytical_query(documents, request.prompt)
+                result = await run_in_threadpool(rag_service.process_analytical_query, documents, request.prompt)
                 response_data["answer"] = result
                 response_data["matching_transactions_count"] = len(documents)
             else:
                 # Specific query - use vector search
                 k_value = min(50, len(documents))
-                result = rag_service.process_vector_search_query(vectorstore, request.prompt, k_value)
+                result = await run_in_threadpool(
+                    rag_service.process_vector_search_query, vectorstore, request.prompt, k_value
+                )
                 response_data["answer"] = result
                 response_data["matching_transactions_count"] = k_value
 
-        return RAGResponse(**response_data)
+        return _respond(response_data, page_docs, request.stream)
 
     except Exception as e:
         logger.error(f"Error processing query: {str(e)}")
@@ -182,14 +313,9 @@ async def ingest_context_data(request: IngestRequest):
     try:
         logger.info(f"Ingesting context data: {len(request.context_data)} transactions")
 
-        # Initialize RAG service
-        rag_service = RAGService(embeddings_model, llm)
-
-        # Create vector store
-        vectorstore, langchain_docs = rag_service.create_vector_store(request.context_data)
+        rag_service = get_rag_service()
 
-        # Store in global state
-        set_ingested_data(request.context_data, vectorstore, langchain_docs)
+        await run_in_threadpool(_ingest, rag_service, request.context_data)
 
         ingested_data = get_ingested_data()
 
@@ -232,8 +358,12 @@ async def query_with_prompt(request: PromptRequest):
             detail="No context data ingested. Please call /ingest endpoint first."
         )
 
+    from app.utils.filters import extract_filters_from_query
+    from app.utils.query_mode import detect_query_mode, is_analytical_or_counting
+
     try:
         logger.info(f"Processing prompt query: {request.prompt}, page: {request.page}")
+        prompt_lower = request.prompt.lower()
 
         # Get ingested data
         ingested_data = get_ingested_data()
@@ -243,7 +373,7 @@ async def query_with_prompt(request: PromptRequest):
         logger.info(f"Using ingested data: {len(documents)} transactions")
 
         # Extract filters to generate/validate query_id
-        filters = extract_filters_from_query(request.prompt)
+        filters = extract_filters_from_query(request.prompt, prompt_lower)
         logger.info(f"Extracted filters: {filters}")
 
         # Generate or use provided query_id
@@ -263,15 +393,16 @@ async def query_with_prompt(request: PromptRequest):
 
             mode = cached_data["mode"]
             answer = cached_data["answer"]
-            filtered_docs = cached_data["filtered_docs"]
+            total = cached_data["total"]
             filters_applied = cached_data["filters_applied"]
             statistics = cached_data.get("statistics")
 
             # Prepare response with cached data
+            page_docs = None
             response_data = {
                 "query_id": query_id,
                 "mode": mode,
-                "matching_transactions_count": len(filtered_docs),
+                "matching_transactions_count": total,
                 "filters_applied": filters_applied,
                 "answer": answer,
                 "transactions": None,
@@ -279,42 +410,28 @@ async def query_with_prompt(request: PromptRequest):
                 "statistics": statistics
             }
 
-            # Paginate the cached filtered_docs
-            if request.show_all and filtered_docs:
-                sorted_docs = sorted(filtered_docs, key=lambda x: float(x.get('amount', 0)), reverse=True)
-
-                start_idx = (request.page - 1) * request.page_size
-                end_idx = start_idx + request.page_size
-                paginated_docs = sorted_docs[start_idx:end_idx]
+            # Paginate the cached sorted documents
+            if request.show_all and total:
+                page_docs, response_data["pagination"] = _paginate(
+                    cached_data["sorted_docs"], request.page, request.page_size
+                )
 
-                response_data["transactions"] = [
-                    format_transaction_for_api(doc) for doc in paginated_docs
-                ]
-                response_data["pagination"] = {
-                    "page": request.page,
-                    "page_size": request.page_size,
-                    "total_items": len(filtered_docs),
-                    "total_pages": (len(filtered_docs) + request.page_size - 1) // request.page_size,
-                    "has_next": end_idx < len(filtered_docs),
-                    "has_prev": request.page > 1
-                }
-
-            return RAGResponse(**response_data)
+            return _respond(response_data, page_docs, request.stream)
 
         # No cache or page 1 - process normally and cache results
         logger.info("Processing new query or page 1 - will generate LLM response and cache")
 
-        # Initialize RAG service
-        rag_service = RAGService(embeddings_model, llm)
+        rag_service = get_rag_service()
 
         # Detect query mode
-        mode = detect_query_mode(request.prompt, documents)
+        mode = detect_query_mode(request.prompt, documents, prompt_lower)
         if request.use_full_data is not None:
             mode = "SMART_FULL" if request.use_full_data else "VECTOR_SEARCH"
 
         logger.info(f"Query mode: {mode}")
 
         # Prepare response
+        page_docs = None
         response_data = {
             "query_id": query_id,
             "mode": mode,
@@ -328,70 +445,33 @@ async def query_with_prompt(request: PromptRequest):
 
         # Process based on mode
         if mode == "STATISTICAL":
-            answer, stats, filter_desc, match_count = rag_service.process_statistical_query(
-                documents, request.prompt
+            # Answer and cache results
+            answer, stats, filter_desc, filtered_docs = await run_in_threadpool(
+                _statistical_query, rag_service, documents, request.prompt, query_id
             )
 
             response_data["answer"] = answer
             response_data["statistics"] = stats
             response_data["filters_applied"] = filter_desc
-            response_data["matching_transactions_count"] = match_count
-
-            # Cache results
-            filtered_docs, _ = apply_filters(documents, filters, request.prompt)
-            cache_query_results(query_id, answer, mode, filtered_docs, filter_desc, stats)
+            response_data["matching_transactions_count"] = len(filtered_docs)
 
         elif mode == "SMART_FULL" or request.use_full_data:
-            answer, filtered_docs, filter_descriptions = rag_service.process_smart_full_query(
-                documents, request.prompt, request.show_all
+            # Answer, cache results and select the requested page
+            answer, filtered_docs, filter_descriptions, page_docs, pagination = await run_in_threadpool(
+                _smart_full_query, rag_service, documents, request, mode, query_id
             )
 
             response_data["answer"] = answer
             response_data["matching_transactions_count"] = len(filtered_docs)
             response_data["filters_applied"] = filter_descriptions
-
-            # Cache results
-            cache_query_results(query_id, answer, mode, filtered_docs, filter_descriptions, None)
-
-            # Paginate results
-            if request.show_all and filtered_docs:
-                sorted_docs = sorted(filtered_docs, key=lambda x: float(x.get('amount', 0)), reverse=True)
-
-                start_idx = (request.page - 1) * request.page_size
-                end_idx = start_idx + request.page_size
-                paginated_docs = sorted_docs[start_idx:end_idx]
-
-                response_data["transactions"] = [
-                    format_transaction_for_api(doc) for doc in paginated_docs
-                ]
-                response_data["pagination"] = {
-                    "page": request.page,
-                    "page_size": request.page_size,
-                    "total_items": len(filtered_docs),
-                    "total_pages": (len(filtered_docs) + request.page_size - 1) // request.page_size,
-                    "has_next": end_idx < len(filtered_docs),
-                    "has_prev": request.page > 1
-                }
+            response_data["pagination"] = pagination
 
         else:
             # Vector search mode
-            is_analytical = any(kw in request.prompt.lower() for kw in [
-                'summarize', 'summarise', 'summary', 'analyze', 'analyse',
-                'overview', 'insights', 'patterns', 'trends'
-            ])
-
-            counting_patterns = [
-                r'\b(how many|kitne|count|total)\s+.*?transaction',
-                r'transaction.*?\b(how many|kitne|count|total)',
-                r'\b(कितने|कितनी)\s+.*?(transaction|ट्रांज)',
-                r'(transaction|ट्रांज).*?\b(कितने|कितनी)',
-                r'\bnumber of\s+transaction',
-            ]
-            is_counting_query = any(re.search(pattern, request.prompt.lower()) for pattern in counting_patterns)
-            is_analytical = is_analytical or is_counting_query
+            is_analytical = is_analytical_or_counting(request.prompt, prompt_lower)
 
             if is_analytical:
-                result = rag_service.process_analytical_query(documents, request.prompt)
+                result = await run_in_threadpool(rag_service.process_analytical_query, documents, request.prompt)
                 response_data["answer"] = result
                 response_data["matching_transactions_count"] = len(documents)
 
@@ -400,11 +480,13 @@ async def query_with_prompt(request: PromptRequest):
             else:
                 # Regular vector search
                 k_value = min(50, len(documents))
-                result = rag_service.process_vector_search_query(vectorstore, request.prompt, k_value)
+                result = await run_in_threadpool(
+                    rag_service.process_vector_search_query, vectorstore, request.prompt, k_value
+                )
                 response_data["answer"] = result
                 response_data["matching_transactions_count"] = k_value
 
-        return RAGResponse(**response_data)
+        return _respond(response_data, page_docs, request.stream)
 
     except Exception as e:
         logger.error(f"Error processing prompt query: {str(e)}")
@@ -20,7 +20,10 @@ class Settings:
     # Server Configuration
     HOST: str = "0.0.0.0"
     PORT: int = 9000
-    RELOAD: bool = True
+    RELOAD: bool = os.getenv("DEBUG", "false").lower() == "true"
+    # Ingested data and the query cache live in process memory, so extra workers
+    # only help when clients re-ingest per worker (opt in via WEB_CONCURRENCY)
+    WORKERS: int = max(1, min(int(os.getenv("WEB_CONCURRENCY", "1")), os.cpu_count() or 1))
 
     # CORS Configuration
     ALLOW_ORIGINS: list = ["*"]
@@ -48,12 +51,36 @@ class Settings:
     LLM_TOP_P: float = 0.9
     LLM_FREQUENCY_PENALTY: float = 0.3
     LLM_PRESENCE_PENALTY: float = 0.3
+    # Result sets this small get the template answer instead of an LLM call (0 disables)
+    LLM_SKIP_THRESHOLD: int = int(os.getenv("LLM_SKIP_THRESHOLD", "3"))
 
     # Embedding Model
     EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    # How long the embedding batcher waits to coalesce concurrent requests
+    EMBEDDING_BATCH_WAIT_MS: int = int(os.getenv("EMBEDDING_BATCH_WAIT_MS", "20"))
+    # fp32 (default), fp16 (CUDA only) or int8 (dynamic quantization, CPU only)
+    EMBEDDING_PRECISION: str = os.getenv("EMBEDDING_PRECISION", "fp32").lower()
+    EMBEDDING_QUERY_CACHE_SIZE: int = 2048
+
+    # Vector Index
+    # flat (exact search, default), hnsw or ivf (approximate, sub-linear search for large ingests)
+    FAISS_INDEX_TYPE: str = os.getenv("FAISS_INDEX_TYPE", "flat").lower()
+    # Store vectors as float16 to halve index memory
+    FAISS_FP16: bool = os.getenv("FAISS_FP16", "false").lower() == "true"
+    FAISS_HNSW_M: int = 32
+    # IVF lists probed per query
+    FAISS_IVF_NPROBE: int = 8
+    # Directory to persist the ingested index in (empty disables persistence)
+    FAISS_INDEX_PATH: str = os.getenv("FAISS_INDEX_PATH", "")
+    # The saved docstore is a pickle (unpickling can run code): only enable for a path no one else can write
+    FAISS_ALLOW_DANGEROUS_DESERIALIZATION: bool = (
+        os.getenv("FAISS_ALLOW_DANGEROUS_DESERIALIZATION", "false").lower() == "true"
+    )
 
     # Cache Configuration
     CACHE_TTL_MINUTES: int = 30
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "500"))
 
 
 settings = Settings()
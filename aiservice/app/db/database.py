@@ -1,7 +1,8 @@
 """
 Database models and session management for PostgreSQL persistence
 """
-from sqlalchemy import create_engine, Column, String, JSON, DateTime, Integer, Text, text
+from sqlalchemy import create_engine, Column, String, JSON, DateTime, Integer, Text, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
@@ -25,6 +26,8 @@ engine = create_engine(
     pool_pre_ping=True,  # Verify connections before using
     pool_size=10,         # Connection pool size
     max_overflow=20,      # Max overflow connections
+    pool_recycle=1800,    # Recycle before cloud PG idle timeouts kill connections
+    pool_timeout=30,      # Fail fast instead of waiting forever for a free connection
     echo=False,           # Set to True for SQL debugging
     connect_args={"sslmode": "require"} if "digitalocean.com" in DATABASE_URL else {}
 )
@@ -39,9 +42,13 @@ class UserData(Base):
     Vectorstore is NOT stored due to size limitations (can be 100MB+)
     """
     __tablename__ = "user_data"
+    __table_args__ = (
+        # GIN index for containment/key lookups into the transactions document
+        Index("ix_user_data_transactions", "transactions", postgresql_using="gin"),
+    )
 
     user_id = Column(String, primary_key=True, index=True)
-    transactions = Column(JSON, nullable=False)  # List of transaction dictionaries
+    transactions = Column(JSONB, nullable=False)  # List of transaction dictionaries (binary JSON)
     vectorstore_data = Column(Text, nullable=True, default="")  # Empty - vectorstore rebuilt from transactions
     last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -53,6 +60,10 @@ class ChatHistory(Base):
     Records all queries and responses for auditing and analytics
     """
     __tablename__ = "chat_history"
+    __table_args__ = (
+        # Serves "latest N for a user" and (timestamp, id) keyset pagination without a sort
+        Index("ix_chat_history_user_timestamp_id", "user_id", "timestamp", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     user_id = Column(String, index=True, nullable=False)
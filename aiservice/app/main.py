@@ -7,11 +7,13 @@ import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from app.core.config import settings
 from app.services.embeddings import HuggingFaceEmbeddings
 from app.services.llm import initialize_llm
 from app.api import health, transactions
+from app.utils.data_store import set_ingested_data
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -43,6 +45,21 @@ async def lifespan(app: FastAPI):
         health.set_models(embeddings_model, llm)
         transactions.set_models(embeddings_model, llm)
 
+        # Restore the last ingest saved on disk, if any
+        if settings.FAISS_INDEX_PATH:
+            from app.utils.index_store import load_index, persistence_enabled
+            if not persistence_enabled():
+                logger.warning(
+                    "FAISS_INDEX_PATH is set but FAISS_ALLOW_DANGEROUS_DESERIALIZATION is not: "
+                    "the saved index could not be loaded back, so ingests will not be saved"
+                )
+            else:
+                saved = load_index(settings.FAISS_INDEX_PATH, embeddings_model)
+                if saved is not None:
+                    vectorstore, langchain_docs, saved_transactions = saved
+                    set_ingested_data(saved_transactions, vectorstore, langchain_docs)
+                    logger.info(f"✅ Restored {len(saved_transactions)} ingested transactions")
+
     except Exception as e:
         logger.error(f"Failed to initialize models: {e}")
 
@@ -57,7 +74,8 @@ app = FastAPI(
     title=settings.APP_TITLE,
     description=settings.APP_DESCRIPTION,
     version=settings.APP_VERSION,
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse  # C-backed JSON encoding for large transaction pages
 )
 
 # CORS middleware
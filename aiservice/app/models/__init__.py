@@ -1,6 +1,7 @@
 # Models package
 from .schemas import (
     TransactionData,
+    TransactionList,
     RAGRequest,
     IngestRequest,
     IngestResponse,
@@ -11,6 +12,7 @@ from .schemas import (
 
 __all__ = [
     "TransactionData",
+    "TransactionList",
     "RAGRequest",
     "IngestRequest",
     "IngestResponse",
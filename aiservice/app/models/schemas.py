@@ -2,7 +2,7 @@
 Pydantic models for request/response validation
 """
 
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter
 from typing import List, Dict, Any, Optional
 
 
@@ -21,19 +21,24 @@ class TransactionData(BaseModel):
     pk_GSI_1: Optional[str] = None
 
 
+# Validates/dumps whole transaction lists in one pydantic-core call
+TransactionList = TypeAdapter(List[TransactionData])
+
+
 class RAGRequest(BaseModel):
     """Request model for RAG query"""
-    context_data: List[Dict[str, Any]] = Field(..., description="List of transaction records")
+    context_data: List[TransactionData] = Field(..., description="List of transaction records")
     prompt: str = Field(..., description="User's question")
     page: int = Field(1, ge=1, description="Page number for pagination")
     page_size: int = Field(20, ge=1, le=100, description="Items per page")
     show_all: bool = Field(True, description="Show all matching transactions")
     use_full_data: Optional[bool] = Field(None, description="Force full scan mode")
+    stream: bool = Field(False, description="Stream the page as NDJSON (header, one line per transaction, footer)")
 
 
 class IngestRequest(BaseModel):
     """Request model for ingesting context data"""
-    context_data: List[Dict[str, Any]] = Field(..., description="List of transaction records to ingest")
+    context_data: List[TransactionData] = Field(..., description="List of transaction records to ingest")
 
 
 class IngestResponse(BaseModel):
@@ -51,6 +56,7 @@ class PromptRequest(BaseModel):
     page_size: int = Field(20, ge=1, le=100, description="Items per page")
     show_all: bool = Field(True, description="Show all matching transactions")
     use_full_data: Optional[bool] = Field(None, description="Force full scan mode")
+    stream: bool = Field(False, description="Stream the page as NDJSON (header, one line per transaction, footer)")
     query_id: Optional[str] = Field(None, description="Query ID for pagination caching (auto-generated if not provided)")
 
 
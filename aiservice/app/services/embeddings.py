@@ -3,7 +3,11 @@ Custom embeddings wrapper using HuggingFace sentence-transformers
 """
 
 import logging
-from typing import List
+from functools import lru_cache
+from typing import List, Tuple
+
+import numpy as np
+import torch
 
 # Back-compat shim for sentence-transformers expecting huggingface_hub.cached_download
 try:
@@ -18,6 +22,7 @@ except Exception:
 
 from sentence_transformers import SentenceTransformer
 from langchain_core.embeddings import Embeddings
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -25,13 +30,61 @@ logger = logging.getLogger(__name__)
 class HuggingFaceEmbeddings(Embeddings):
     """Custom wrapper for HuggingFace embeddings"""
 
-    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
-        logger.info(f"Loading embedding model: {model_name}")
-        self.model = SentenceTransformer(model_name)
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        precision: str = settings.EMBEDDING_PRECISION
+    ):
+        logger.info(f"Loading embedding model: {model_name} (precision: {precision})")
+
+        if precision == "int8":
+            # Dynamically quantized Linear layers only run on CPU
+            self.model = SentenceTransformer(model_name, device="cpu")
+            self.model = torch.quantization.quantize_dynamic(
+                self.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        else:
+            self.model = SentenceTransformer(model_name)
+            if precision == "fp16":
+                if torch.cuda.is_available():
+                    self.model.half()
+                else:
+                    logger.warning("fp16 embeddings need CUDA - falling back to fp32")
+
+        # Per-instance cache so repeated prompts (pagination, retries) skip the forward pass
+        self._embed_query_cached = lru_cache(maxsize=settings.EMBEDDING_QUERY_CACHE_SIZE)(
+            self._encode_query
+        )
+
         logger.info("Embedding model loaded successfully")
 
+    def encode_np(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode texts into a contiguous float32 matrix
+        Encodes in fixed-size batches so large ingests saturate the model
+        without one oversized forward pass
+        """
+        return self.model.encode(
+            texts,
+            batch_size=settings.EMBEDDING_BATCH_SIZE,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        return self.model.encode(texts).tolist()
+        # LangChain interface - prefer encode_np when the consumer accepts arrays
+        return self.encode_np(texts).tolist()
+
+    def _encode_query(self, text: str) -> Tuple[float, ...]:
+        # Normalized like embed_documents so query and document vectors stay comparable.
+        # Returned as a tuple so cached vectors can't be mutated by callers
+        return tuple(self.model.encode(
+            [text],
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )[0].tolist())
 
     def embed_query(self, text: str) -> List[float]:
-        return self.model.encode([text])[0].tolist()
+        return list(self._embed_query_cached(text))
@@ -5,6 +5,7 @@ LLM initialization and management
 import os
 import logging
 import typing
+from functools import lru_cache
 
 # Back-compat shim for pydantic v1 under Python 3.12 (ForwardRef._evaluate signature change)
 try:
@@ -27,8 +28,12 @@ from app.core.config import settings
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=1)
 def initialize_llm() -> ChatOpenAI:
-    """Initialize and return LLM instance"""
+    """
+    Initialize and return LLM instance
+    Cached: every caller shares one client (failures are not cached, so a later call retries)
+    """
 
     for model in settings.FREE_MODELS:
         try:
@@ -3,76 +3,247 @@ RAG (Retrieval-Augmented Generation) Service
 Core business logic for transaction querying with LLM
 """
 
+import io
+import heapq
+import math
+import uuid
 import logging
-from typing import List, Dict, Tuple
+from typing import Any, List, Dict, Optional, Tuple
+
+import faiss
+import numpy as np
+import pandas as pd
 from langchain_core.documents import Document
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough
 
+from app.core.config import settings
 from app.utils.formatters import format_transaction_for_vector
-from app.utils.filters import extract_filters_from_query, apply_filters
+from app.utils.filters import extract_filters_from_query, filter_transaction_indices
 from app.utils.query_mode import calculate_statistics
 from app.utils.answer_generator import generate_conversational_answer
+from app.utils.embed_batcher import get_embedding_batcher
+from app.utils.index_store import transactions_hash, load_index, save_index, persistence_enabled
+from app.utils.data_store import get_transaction_frame, get_formatted_transactions, get_ingested_data
+from app.utils.fast_stats import amount_stats, group_totals
+from app.utils.lang import detect_language
 
 logger = logging.getLogger(__name__)
 
 
+# Prompt templates are parsed once at import instead of on every query
+_ANALYTICAL_PROMPT = ChatPromptTemplate.from_template("""You are an intelligent financial analyst with access to COMPLETE transaction data.
+
+🎯 CRITICAL: You have COMPREHENSIVE statistics and breakdowns from EXACTLY {total_transactions} transactions.
+The statistics (totals, averages, breakdowns by type/mode/month) represent the ENTIRE dataset of {total_transactions} transactions, not just samples.
+
+🧠 UNDERSTAND THE USER'S INTENT:
+First, read the user's question carefully and understand:
+- What are they asking for? (summary, analysis, insights, trends, count, specific transactions, comparisons, etc.)
+- What's the context? (time period, amount range, person, mode, etc.)
+- What level of detail do they want?
+
+🌐 LANGUAGE INTELLIGENCE:
+- Hindi (Devanagari script) → Respond in pure Hindi (Devanagari)
+- Hinglish (Roman script with Hindi words like 'mujhe', 'dikhao', 'saari', 'batao', 'kitne') → Respond in Hinglish (Roman script)
+- English → Respond in English
+- Match the user's tone and formality level
+
+📊 COMPLETE TRANSACTION DATA (ALL {total_transactions} transactions analyzed):
+{context}
+
+❓ USER'S QUESTION: {question}
+
+💡 YOUR APPROACH:
+1. **EXACT COUNT**: If asked "how many" or "kitne" transactions, the answer is EXACTLY {total_transactions}
+2. **Acknowledge scope**: You're analyzing ALL {total_transactions} transactions (not just samples)
+3. **Use comprehensive stats**: All breakdowns and totals represent the complete dataset of {total_transactions} transactions
+4. **Be specific**: Use exact numbers from the statistics
+5. **Provide insights**: Identify patterns, trends, anomalies across the full dataset
+6. **Natural response**: Be conversational and match user's language style
+7. **Accurate**: All numbers are from the complete dataset of {total_transactions} transactions
+8. **Sample awareness**: The detailed transactions shown are examples; your stats cover all {total_transactions}
+
+🚀 YOUR INTELLIGENT RESPONSE (analyzing ALL {total_transactions} transactions):""")
+
+_VECTOR_SEARCH_PROMPT = ChatPromptTemplate.from_template("""You are an intelligent financial assistant with expertise in analyzing transaction data.
+
+🧠 UNDERSTAND FIRST, THEN RESPOND:
+1. Read the user's question and understand their true intent
+2. Analyze the transaction data provided in the context
+3. Think about what information would be most helpful
+4. Respond naturally in the user's language
+
+🌐 LANGUAGE INTELLIGENCE:
+- Hindi (Devanagari) → Respond in Hindi (Devanagari)
+- Hinglish (Roman with Hindi words: mujhe, dikhao, saari, batao, kya) → Respond in Hinglish (Roman)
+- English → Respond in English
+
+📋 TRANSACTION CONTEXT (Most relevant transactions):
+{context}
+
+❓ USER'S QUESTION: {question}
+
+💡 GUIDELINES FOR YOUR RESPONSE:
+- Be conversational and natural - avoid robotic templates
+- Directly answer what they're asking
+- Provide specific details (amounts, dates, names, transaction IDs when relevant)
+- If they want a list, mention the transactions you found
+- If they want analysis, provide insights and patterns
+- If they want summary, give overview with key statistics
+- Use emojis moderately for friendliness
+- Be accurate with numbers and facts
+- Match the user's language style and tone
+
+🎯 YOUR NATURAL, HELPFUL RESPONSE:""")
+
+
+def _format_docs(docs: List[Document]) -> str:
+    return "\n\n=== TRANSACTION ===\n\n".join(doc.page_content for doc in docs)
+
+
+def _faiss_index_spec(n_vectors: int) -> str:
+    """faiss.index_factory description for the configured index type"""
+    storage = "SQfp16" if settings.FAISS_FP16 else "Flat"
+    index_type = settings.FAISS_INDEX_TYPE
+
+    if index_type == "hnsw":
+        return f"HNSW{settings.FAISS_HNSW_M},{storage}"
+
+    if index_type == "ivf":
+        nlist = max(1, int(4 * math.sqrt(n_vectors)))
+        # k-means needs ~39 training points per list; smaller ingests stay exact
+        if n_vectors >= 39 * nlist:
+            return f"IVF{nlist},{storage}"
+        logger.info(f"Only {n_vectors} vectors - using a flat index instead of IVF")
+
+    return storage
+
+
+def _filter_with_amounts(documents: List[Dict], filters: Dict) -> Tuple[List[Dict], List[str], np.ndarray]:
+    """Apply filters once, returning the matching documents, descriptions and their amounts"""
+    frame = get_transaction_frame(documents)
+    indices, descriptions = filter_transaction_indices(documents, filters, frame)
+    amounts = frame["amount"].to_numpy()[indices]
+    return [documents[i] for i in indices], descriptions, amounts
+
+
+def _breakdown(frame: pd.DataFrame, key: str) -> Dict[str, Dict[str, float]]:
+    """Count and total amount per value of a frame column, as {value: {'count', 'amount'}}"""
+    codes, labels = pd.factorize(frame[key], use_na_sentinel=False)
+    counts, totals = group_totals(frame["amount"].to_numpy(), codes, len(labels))
+    return {
+        label: {"count": int(count), "amount": float(total)}
+        for label, count, total in zip(labels, counts, totals)
+    }
+
+
 class RAGService:
     """Service for handling RAG-based transaction queries"""
 
     def __init__(self, embeddings_model, llm):
         self.embeddings_model = embeddings_model
         self.llm = llm
+        self.embed_batcher = get_embedding_batcher(embeddings_model)
+        # Retrievers by k for the ingested vector store (dropped on the next ingest)
+        self._retrievers: Tuple[Optional[FAISS], Dict[int, Any]] = (None, {})
 
     def create_vector_store(self, documents: List[Dict]) -> Tuple[FAISS, List[Document]]:
         """Create vector store from transaction documents"""
-        langchain_docs = []
-        for txn in documents:
-            formatted_content = format_transaction_for_vector(txn)
-            doc = Document(
-                page_content=formatted_content,
-                metadata={
-                    "txnId": txn.get("txnId", ""),
-                    "date": txn.get("createdAt", ""),
-                    "amount": float(txn.get("amount", 0)),
-                    "mode": txn.get("mode", txn.get("txnMode", "")),
-                    "type": txn.get("pk_GSI_1", "").replace("TYPE#", ""),
-                    "accountNumber": txn.get("accountId", txn.get("accountNumber", "N/A")),
-                    "narration": txn.get("narration", "N/A")
-                }
-            )
-            langchain_docs.append(doc)
+        texts = [format_transaction_for_vector(txn) for txn in documents]
+        metadatas = [
+            {
+                "txnId": txn.get("txnId", ""),
+                "date": txn.get("createdAt", ""),
+                "amount": float(txn.get("amount", 0)),
+                "mode": txn.get("mode", ""),
+                "type": txn.get("pk_GSI_1", "").replace("TYPE#", ""),
+                "accountNumber": txn.get("accountId", "N/A"),
+                "narration": txn.get("narration", "N/A")
+            }
+            for txn in documents
+        ]
+        # Fields are already str/dict, so skip pydantic validation per Document
+        langchain_docs = [
+            Document.construct(page_content=text, metadata=metadata)
+            for text, metadata in zip(texts, metadatas)
+        ]
 
         logger.info(f"Created {len(langchain_docs)} document objects")
 
-        vectorstore = FAISS.from_documents(langchain_docs, self.embeddings_model)
+        # Embed as one float32 matrix (shared with concurrent ingests) and add it to the
+        # FAISS index directly, reusing the Document objects as the docstore
+        embeddings = self.embed_batcher.encode(texts)
+        vectorstore = self._build_vector_store(embeddings, langchain_docs)
         logger.info("✅ Vector store created")
 
         return vectorstore, langchain_docs
 
+    def ingest_vector_store(self, documents: List[Dict]) -> Tuple[FAISS, List[Document]]:
+        """
+        Vector store for ingested documents, persisted under FAISS_INDEX_PATH when persistence is enabled
+        Re-ingesting the same documents loads the saved index instead of re-embedding
+        """
+        # Release the retrievers (and with them the previous store) before building the new one
+        self._retrievers = (None, {})
+
+        if not persistence_enabled():
+            return self.create_vector_store(documents)
+
+        content_hash = transactions_hash(documents)
+        saved = load_index(settings.FAISS_INDEX_PATH, self.embeddings_model, content_hash)
+        if saved is not None:
+            vectorstore, langchain_docs, _ = saved
+            return vectorstore, langchain_docs
+
+        vectorstore, langchain_docs = self.create_vector_store(documents)
+        try:
+            save_index(settings.FAISS_INDEX_PATH, vectorstore, documents, content_hash)
+        except Exception as e:
+            logger.warning(f"Failed to persist vector index: {e}")
+        return vectorstore, langchain_docs
+
+    def _build_vector_store(self, embeddings: np.ndarray, langchain_docs: List[Document]) -> FAISS:
+        """Wrap an embedding matrix and its documents in a FAISS vector store"""
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        index = faiss.index_factory(embeddings.shape[1], _faiss_index_spec(len(embeddings)))
+        if not index.is_trained:
+            index.train(embeddings)
+        index.add(embeddings)
+        if isinstance(index, faiss.IndexIVF):
+            index.nprobe = settings.FAISS_IVF_NPROBE
+
+        doc_ids = [str(uuid.uuid4()) for _ in langchain_docs]
+        return FAISS(
+            self.embeddings_model,
+            index,
+            InMemoryDocstore(dict(zip(doc_ids, langchain_docs))),
+            dict(enumerate(doc_ids))
+        )
+
     def process_statistical_query(
         self,
         documents: List[Dict],
         prompt: str
-    ) -> Tuple[str, Dict[str, float], List[str], int]:
-        """Process statistical analysis queries"""
+    ) -> Tuple[str, Dict[str, float], List[str], List[Dict]]:
+        """Process statistical analysis queries, returning the matching documents too"""
         filters = extract_filters_from_query(prompt)
-        stats = calculate_statistics(documents, filters)
-        filtered_docs, filter_desc = apply_filters(documents, filters, prompt)
+        filtered_docs, filter_desc, amounts = _filter_with_amounts(documents, filters)
+        stats = calculate_statistics(documents, filters, amounts)
 
-        is_hindi = any(ord(c) >= 0x0900 and ord(c) <= 0x097F for c in prompt)
-        is_hinglish = any(word in prompt.lower() for word in ['mujhe', 'saari', 'dikhao'])
+        language = detect_language(prompt)
 
         filter_text = " (" + ", ".join(filter_desc) + ")" if filter_desc else ""
 
-        if is_hindi:
+        if language == "hi":
             answer = f"📊 सांख्यिकी{filter_text}:\n"
             answer += f"• कुल: {stats['count']}\n"
             answer += f"• राशि: ₹{stats['total']:,.2f}\n"
             answer += f"• औसत: ₹{stats['average']:,.2f}\n"
-        elif is_hinglish:
+        elif language == "hinglish":
             answer = f"📊 Statistics{filter_text}:\n"
             answer += f"• Total: {stats['count']}\n"
             answer += f"• Amount: ₹{stats['total']:,.2f}\n"
@@ -83,7 +254,7 @@ class RAGService:
             answer += f"• Amount: ₹{stats['total']:,.2f}\n"
             answer += f"• Average: ₹{stats['average']:,.2f}\n"
 
-        return answer, stats, filter_desc, len(filtered_docs)
+        return answer, stats, filter_desc, filtered_docs
 
     def process_smart_full_query(
         self,
@@ -93,7 +264,7 @@ class RAGService:
     ) -> Tuple[str, List[Dict], List[str]]:
         """Process full scan queries with filters"""
         filters = extract_filters_from_query(prompt)
-        filtered_docs, filter_descriptions = apply_filters(documents, filters, prompt)
+        filtered_docs, filter_descriptions, amounts = _filter_with_amounts(documents, filters)
 
         # Generate answer using LLM
         answer = generate_conversational_answer(
@@ -102,7 +273,9 @@ class RAGService:
             filters,
             filter_descriptions,
             show_all,
-            self.llm
+            self.llm,
+            language=detect_language(prompt),
+            amounts=amounts
         )
 
         return answer, filtered_docs, filter_descriptions
@@ -116,141 +289,93 @@ class RAGService:
         logger.info(f"Analytical query detected - analyzing ALL {len(documents)} transactions")
 
         # Calculate comprehensive statistics from ALL transactions
-        amounts = [float(d.get('amount', 0)) for d in documents]
-        total_amount = sum(amounts)
-        avg_amount = total_amount / len(amounts) if amounts else 0
-
-        # Analyze by transaction type and mode
-        type_breakdown = {}
-        mode_breakdown = {}
-        date_breakdown = {}
-
-        for doc in documents:
-            # Type breakdown
-            txn_type = doc.get('pk_GSI_1', '').replace('TYPE#', '')
-            if txn_type not in type_breakdown:
-                type_breakdown[txn_type] = {'count': 0, 'amount': 0.0}
-            type_breakdown[txn_type]['count'] += 1
-            type_breakdown[txn_type]['amount'] += float(doc.get('amount', 0))
-
-            # Mode breakdown
-            txn_mode = doc.get('mode', doc.get('txnMode', 'UNKNOWN'))
-            if txn_mode not in mode_breakdown:
-                mode_breakdown[txn_mode] = {'count': 0, 'amount': 0.0}
-            mode_breakdown[txn_mode]['count'] += 1
-            mode_breakdown[txn_mode]['amount'] += float(doc.get('amount', 0))
-
-            # Month breakdown
-            created_at = doc.get('createdAt', '')
-            if created_at:
-                month_key = created_at[:7]
-                if month_key not in date_breakdown:
-                    date_breakdown[month_key] = {'count': 0, 'amount': 0.0}
-                date_breakdown[month_key]['count'] += 1
-                date_breakdown[month_key]['amount'] += float(doc.get('amount', 0))
-
-        # Get diverse sample of transactions
-        sorted_by_amount = sorted(documents, key=lambda x: float(x.get('amount', 0)), reverse=True)
-        sorted_by_date = sorted(documents, key=lambda x: x.get('createdAt', ''), reverse=True)
-
-        sample_transactions = []
+        frame = get_transaction_frame(documents)
+        total_amount, avg_amount, max_amount, min_amount = amount_stats(frame["amount"].to_numpy())
+
+        # Analyze by transaction type, mode and month (first-seen key order, like the dicts they replace)
+        type_breakdown = _breakdown(frame, "type_label")
+        mode_breakdown = _breakdown(frame, "mode_label")
+        date_breakdown = _breakdown(frame[frame["month_key"] != ""], "month_key")
+
+        # Get diverse sample of transactions by row, reading keys from frame columns
+        # (partial selection, same order as slicing full sorts)
+        amount_of = frame["amount"].tolist().__getitem__
+        created_at_of = frame["created_at"].tolist().__getitem__
+        txn_ids = frame["txn_id"].tolist()
+        rows = range(len(documents))
+
+        highest = heapq.nlargest(10, rows, key=amount_of)
+        # Tail of the descending sort: ties keep document order, so rank on (-amount, index)
+        lowest = reversed(heapq.nlargest(5, rows, key=lambda i: (-amount_of(i), i)))
+        most_recent = heapq.nlargest(15, rows, key=created_at_of)
+
+        sample_rows = []
         seen_ids = set()
 
         # Top 10 highest amounts
-        for txn in sorted_by_amount[:10]:
-            txn_id = txn.get('txnId', '')
-            if txn_id not in seen_ids:
-                seen_ids.add(txn_id)
-                sample_transactions.append(txn)
+        for i in highest:
+            if txn_ids[i] not in seen_ids:
+                seen_ids.add(txn_ids[i])
+                sample_rows.append(i)
 
         # Bottom 5 lowest amounts
-        for txn in sorted_by_amount[-5:]:
-            txn_id = txn.get('txnId', '')
-            if txn_id not in seen_ids and len(sample_transactions) < 15:
-                seen_ids.add(txn_id)
-                sample_transactions.append(txn)
+        for i in lowest:
+            if txn_ids[i] not in seen_ids and len(sample_rows) < 15:
+                seen_ids.add(txn_ids[i])
+                sample_rows.append(i)
 
         # Recent 15 transactions
-        for txn in sorted_by_date[:15]:
-            txn_id = txn.get('txnId', '')
-            if txn_id not in seen_ids and len(sample_transactions) < 30:
-                seen_ids.add(txn_id)
-                sample_transactions.append(txn)
-
-        # Format comprehensive context
-        context_parts = [
-            f"📊 COMPLETE DATASET ANALYSIS (ALL {len(documents)} TRANSACTIONS):",
-            f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━",
-            f"Total Transactions: {len(documents)}",
-            f"Total Amount: ₹{total_amount:,.2f}",
-            f"Average Amount: ₹{avg_amount:,.2f}",
-            f"Highest Transaction: ₹{max(amounts):,.2f}" if amounts else "N/A",
-            f"Lowest Transaction: ₹{min(amounts):,.2f}" if amounts else "N/A",
-            "",
-            f"📈 BREAKDOWN BY TRANSACTION TYPE (ALL {len(documents)} transactions):",
-        ]
-
+        for i in most_recent:
+            if txn_ids[i] not in seen_ids and len(sample_rows) < 30:
+                seen_ids.add(txn_ids[i])
+                sample_rows.append(i)
+
+        sample_transactions = [documents[i] for i in sample_rows]
+
+        # Format comprehensive context, written line by line into one buffer
+        n_docs = len(documents)
+        buf = io.StringIO()
+
+        def line(text: str = ""):
+            buf.write(text)
+            buf.write("\n")
+
+        line(f"📊 COMPLETE DATASET ANALYSIS (ALL {n_docs} TRANSACTIONS):")
+        line("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+        line(f"Total Transactions: {n_docs}")
+        line(f"Total Amount: ₹{total_amount:,.2f}")
+        line(f"Average Amount: ₹{avg_amount:,.2f}")
+        line(f"Highest Transaction: ₹{max_amount:,.2f}" if documents else "N/A")
+        line(f"Lowest Transaction: ₹{min_amount:,.2f}" if documents else "N/A")
+        line()
+        line(f"📈 BREAKDOWN BY TRANSACTION TYPE (ALL {n_docs} transactions):")
         for txn_type, data in sorted(type_breakdown.items(), key=lambda x: x[1]['amount'], reverse=True):
-            context_parts.append(f"  • {txn_type}: {data['count']} transactions, Total: ₹{data['amount']:,.2f}")
+            line(f"  • {txn_type}: {data['count']} transactions, Total: ₹{data['amount']:,.2f}")
 
-        context_parts.append("")
-        context_parts.append(f"💳 BREAKDOWN BY MODE (ALL {len(documents)} transactions):")
+        line()
+        line(f"💳 BREAKDOWN BY MODE (ALL {n_docs} transactions):")
         for mode, data in sorted(mode_breakdown.items(), key=lambda x: x[1]['amount'], reverse=True):
-            context_parts.append(f"  • {mode}: {data['count']} transactions, Total: ₹{data['amount']:,.2f}")
+            line(f"  • {mode}: {data['count']} transactions, Total: ₹{data['amount']:,.2f}")
 
         if date_breakdown:
-            context_parts.append("")
-            context_parts.append(f"📅 MONTHLY BREAKDOWN (ALL {len(documents)} transactions):")
+            line()
+            line(f"📅 MONTHLY BREAKDOWN (ALL {n_docs} transactions):")
             for month, data in sorted(date_breakdown.items(), reverse=True)[:6]:
-                context_parts.append(f"  • {month}: {data['count']} transactions, Total: ₹{data['amount']:,.2f}")
+                line(f"  • {month}: {data['count']} transactions, Total: ₹{data['amount']:,.2f}")
 
-        context_parts.extend([
-            "",
-            f"📋 REPRESENTATIVE SAMPLE TRANSACTIONS ({len(sample_transactions)} shown from {len(documents)} total):",
-            ""
-        ])
+        line()
+        line(f"📋 REPRESENTATIVE SAMPLE TRANSACTIONS ({len(sample_transactions)} shown from {n_docs} total):")
+        line()
 
+        # Reuse the text formatted for the vector store at ingest
+        formatted_by_id = get_formatted_transactions(documents)
         for i, txn in enumerate(sample_transactions, 1):
-            context_parts.append(f"Sample Transaction {i}:")
-            context_parts.append(format_transaction_for_vector(txn))
-            context_parts.append("")
-
-        comprehensive_context = "\n".join(context_parts)
-
-        # Enhanced prompt for analytical queries
-        prompt_template = ChatPromptTemplate.from_template("""You are an intelligent financial analyst with access to COMPLETE transaction data.
+            line(f"Sample Transaction {i}:")
+            line(formatted_by_id.get(txn.get('txnId')) or format_transaction_for_vector(txn))
+            line()
 
-🎯 CRITICAL: You have COMPREHENSIVE statistics and breakdowns from EXACTLY {total_transactions} transactions.
-The statistics (totals, averages, breakdowns by type/mode/month) represent the ENTIRE dataset of {total_transactions} transactions, not just samples.
-
-🧠 UNDERSTAND THE USER'S INTENT:
-First, read the user's question carefully and understand:
-- What are they asking for? (summary, analysis, insights, trends, count, specific transactions, comparisons, etc.)
-- What's the context? (time period, amount range, person, mode, etc.)
-- What level of detail do they want?
-
-🌐 LANGUAGE INTELLIGENCE:
-- Hindi (Devanagari script) → Respond in pure Hindi (Devanagari)
-- Hinglish (Roman script with Hindi words like 'mujhe', 'dikhao', 'saari', 'batao', 'kitne') → Respond in Hinglish (Roman script)
-- English → Respond in English
-- Match the user's tone and formality level
-
-📊 COMPLETE TRANSACTION DATA (ALL {total_transactions} transactions analyzed):
-{context}
-
-❓ USER'S QUESTION: {question}
-
-💡 YOUR APPROACH:
-1. **EXACT COUNT**: If asked "how many" or "kitne" transactions, the answer is EXACTLY {total_transactions}
-2. **Acknowledge scope**: You're analyzing ALL {total_transactions} transactions (not just samples)
-3. **Use comprehensive stats**: All breakdowns and totals represent the complete dataset of {total_transactions} transactions
-4. **Be specific**: Use exact numbers from the statistics
-5. **Provide insights**: Identify patterns, trends, anomalies across the full dataset
-6. **Natural response**: Be conversational and match user's language style
-7. **Accurate**: All numbers are from the complete dataset of {total_transactions} transactions
-8. **Sample awareness**: The detailed transactions shown are examples; your stats cover all {total_transactions}
-
-🚀 YOUR INTELLIGENT RESPONSE (analyzing ALL {total_transactions} transactions):""")
+        # Drop the last terminator: same text as joining the lines with "\n"
+        comprehensive_context = buf.getvalue()[:-1]
 
         prompt_input = {
             "context": comprehensive_context,
@@ -258,11 +383,28 @@ First, read the user's question carefully and understand:
             "total_transactions": len(documents)
         }
 
-        chain = prompt_template | self.llm | StrOutputParser()
+        # Enhanced prompt for analytical queries
+        chain = _ANALYTICAL_PROMPT | self.llm | StrOutputParser()
         result = chain.invoke(prompt_input)
 
         return result
 
+    def _get_retriever(self, vectorstore: FAISS, k_value: int):
+        """Retriever returning the top k_value documents, reused across queries on the ingested store"""
+        if vectorstore is not get_ingested_data()["vectorstore"]:
+            # Per-request /query stores are searched once: caching would only keep them alive
+            return vectorstore.as_retriever(search_kwargs={"k": k_value})
+
+        store, by_k = self._retrievers
+        if store is not vectorstore:
+            by_k = {}
+            self._retrievers = (vectorstore, by_k)
+
+        retriever = by_k.get(k_value)
+        if retriever is None:
+            retriever = by_k[k_value] = vectorstore.as_retriever(search_kwargs={"k": k_value})
+        return retriever
+
     def process_vector_search_query(
         self,
         vectorstore: FAISS,
@@ -272,46 +414,12 @@ First, read the user's question carefully and understand:
         """Process specific queries using vector similarity search"""
         logger.info(f"Using vector similarity search with k={k_value}")
 
-        prompt_template = ChatPromptTemplate.from_template("""You are an intelligent financial assistant with expertise in analyzing transaction data.
-
-🧠 UNDERSTAND FIRST, THEN RESPOND:
-1. Read the user's question and understand their true intent
-2. Analyze the transaction data provided in the context
-3. Think about what information would be most helpful
-4. Respond naturally in the user's language
-
-🌐 LANGUAGE INTELLIGENCE:
-- Hindi (Devanagari) → Respond in Hindi (Devanagari)
-- Hinglish (Roman with Hindi words: mujhe, dikhao, saari, batao, kya) → Respond in Hinglish (Roman)
-- English → Respond in English
-
-📋 TRANSACTION CONTEXT (Most relevant transactions):
-{context}
-
-❓ USER'S QUESTION: {question}
-
-💡 GUIDELINES FOR YOUR RESPONSE:
-- Be conversational and natural - avoid robotic templates
-- Directly answer what they're asking
-- Provide specific details (amounts, dates, names, transaction IDs when relevant)
-- If they want a list, mention the transactions you found
-- If they want analysis, provide insights and patterns
-- If they want summary, give overview with key statistics
-- Use emojis moderately for friendliness
-- Be accurate with numbers and facts
-- Match the user's language style and tone
-
-🎯 YOUR NATURAL, HELPFUL RESPONSE:""")
-
-        def format_docs(docs):
-            return "\n\n=== TRANSACTION ===\n\n".join(doc.page_content for doc in docs)
-
         rag_chain = (
             {
-                "context": vectorstore.as_retriever(search_kwargs={"k": k_value}) | format_docs,
+                "context": self._get_retriever(vectorstore, k_value) | _format_docs,
                 "question": RunnablePassthrough()
             }
-            | prompt_template
+            | _VECTOR_SEARCH_PROMPT
             | self.llm
             | StrOutputParser()
         )
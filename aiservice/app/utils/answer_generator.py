@@ -2,11 +2,28 @@
 Answer generation utilities using LLM
 """
 
+import re
 import logging
-from typing import List, Dict, Optional
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.utils.fast_stats import amount_stats
+from app.utils.lang import Language, detect_language
 
 logger = logging.getLogger(__name__)
 
+# Questions asking for analysis still go to the LLM however few transactions match
+_ANALYTICAL_RE = re.compile(r'analy[sz]|summar|trend|pattern|insight', re.IGNORECASE)
+
+
+@lru_cache(maxsize=256)
+def _format_filter_context(filter_descriptions: Tuple[str, ...]) -> str:
+    """Filter summary line for the LLM context (repeat filter combinations are common)"""
+    return ", ".join(filter_descriptions) if filter_descriptions else "No filters"
+
 
 def generate_conversational_answer(
     question: str,
@@ -14,32 +31,37 @@ def generate_conversational_answer(
     filters: Dict,
     filter_descriptions: List[str] = None,
     show_all: bool = False,
-    llm_instance = None
+    llm_instance = None,
+    language: Optional[Language] = None,
+    amounts: Optional[np.ndarray] = None
 ) -> str:
-    """Generate conversational answer using LLM for natural responses"""
+    """
+    Generate conversational answer using LLM for natural responses
+    language is the detect_language() result, if the caller already has it
+    amounts are the filtered_docs amounts (row for row), if the caller already has them
+    """
+    if language is None:
+        language = detect_language(question)
 
     if not filtered_docs:
-        is_hindi = any(ord(c) >= 0x0900 and ord(c) <= 0x097F for c in question)
-        is_hinglish = any(word in question.lower() for word in ['mujhe', 'saari', 'dikhao', 'batao', 'kya'])
-
-        if is_hindi:
+        if language == "hi":
             return "मुझे आपके सवाल से मेल खाने वाली कोई ट्रांज़ैक्शन नहीं मिली। 😊"
-        elif is_hinglish:
+        elif language == "hinglish":
             return "Sorry! 😊 Aapke filters ke hisaab se koi transaction nahi mili."
         return "No transactions found matching your query."
 
     # Calculate statistics
-    amounts = [float(d.get("amount", 0)) for d in filtered_docs]
-    total_amount = sum(amounts)
-    avg_amount = total_amount / len(amounts) if amounts else 0
-    max_amount = max(amounts) if amounts else 0
-    min_amount = min(amounts) if amounts else 0
+    if amounts is None:
+        amounts = np.fromiter((float(d.get("amount", 0)) for d in filtered_docs), dtype=np.float64, count=len(filtered_docs))
+    total_amount, avg_amount, max_amount, min_amount = amount_stats(amounts)
 
     # Prepare transaction summary for LLM
-    filter_context = ", ".join(filter_descriptions) if filter_descriptions else "No filters"
+    filter_context = _format_filter_context(tuple(filter_descriptions or ()))
 
     # If LLM is available, use it for natural response
-    if llm_instance:
+    # (a handful of plain matches is covered by the template, saving the round trip)
+    needs_llm = len(filtered_docs) > settings.LLM_SKIP_THRESHOLD or _ANALYTICAL_RE.search(question)
+    if llm_instance and needs_llm:
         # Sample transactions for context (max 10 for preview)
         sample_txns = filtered_docs[:10]
         txn_details = []
@@ -47,7 +69,7 @@ def generate_conversational_answer(
             txn_details.append(
                 f"Transaction {i}: "
                 f"₹{float(txn.get('amount', 0)):,.2f} ({txn.get('pk_GSI_1', 'N/A').replace('TYPE#', '')}), "
-                f"{txn.get('mode', txn.get('txnMode', 'N/A'))}, "
+                f"{txn.get('mode', 'N/A')}, "
                 f"{txn.get('createdAt', 'N/A')[:10]}, "
                 f"Narration: {txn.get('narration', 'N/A')[:50]}"
             )
@@ -92,13 +114,10 @@ YOUR NATURAL RESPONSE:"""
             logger.error(f"LLM generation failed: {e}")
             # Fallback to template
 
-    # Fallback: Template-based response (if LLM unavailable)
-    is_hindi = any(ord(c) >= 0x0900 and ord(c) <= 0x097F for c in question)
-    is_hinglish = any(word in question.lower() for word in ['mujhe', 'saari', 'dikhao', 'batao', 'kya', 'ki', 'se', 'ko'])
-
-    if is_hindi:
+    # Fallback: Template-based response (if LLM unavailable or skipped)
+    if language == "hi":
         return f"नमस्ते! 😊 {len(filtered_docs)} ट्रांज़ैक्शन मिली हैं।\n\n📊 सारांश:\n   • कुल राशि: ₹{total_amount:,.2f}\n   • औसत: ₹{avg_amount:,.2f}"
-    elif is_hinglish:
+    elif language == "hinglish":
         return f"Namaste! 😊 Maine {len(filtered_docs)} transactions nikali hain.\n\n📊 Summary:\n   • Total: ₹{total_amount:,.2f}\n   • Average: ₹{avg_amount:,.2f}"
     else:
         return f"Hello! 😊 I found {len(filtered_docs)} transaction(s).\n\n📊 Summary:\n   • Total: ₹{total_amount:,.2f}\n   • Average: ₹{avg_amount:,.2f}"
@@ -2,70 +2,73 @@
 Cache management for query results
 """
 
-import hashlib
-import json
 import logging
+import threading
+from operator import itemgetter
 from typing import Dict, List, Any, Optional
-from datetime import datetime, timedelta
+
+import orjson
+import xxhash
+from cachetools import TTLCache
+
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
 # Query cache for pagination (stores LLM responses and filtered results)
-query_cache: Dict[str, Dict[str, Any]] = {}
+# Bounded and TTL-evicted so long-running servers don't accumulate matched documents forever;
+# guarded by a lock because endpoints run query work in threadpool workers
+query_cache: TTLCache = TTLCache(maxsize=settings.CACHE_MAX_ENTRIES, ttl=settings.CACHE_TTL_MINUTES * 60)
+_cache_lock = threading.RLock()
+cache_stats: Dict[str, int] = {"hits": 0, "misses": 0}
 
 
 def generate_query_id(prompt: str, filters: Dict[str, Any]) -> str:
     """Generate a unique query ID based on prompt and filters"""
-    cache_key = f"{prompt}_{json.dumps(filters, sort_keys=True)}"
-    return hashlib.md5(cache_key.encode()).hexdigest()
-
-
-def cleanup_expired_cache():
-    """Remove expired cache entries"""
-    global query_cache
-    current_time = datetime.now()
-    expired_keys = []
-
-    for query_id, cache_data in query_cache.items():
-        if current_time - cache_data["timestamp"] > timedelta(minutes=settings.CACHE_TTL_MINUTES):
-            expired_keys.append(query_id)
-
-    for key in expired_keys:
-        del query_cache[key]
-        logger.info(f"Removed expired cache entry: {key}")
+    cache_key = prompt.encode() + b"_" + orjson.dumps(filters, option=orjson.OPT_SORT_KEYS)
+    return xxhash.xxh3_128_hexdigest(cache_key)
 
 
 def get_cached_query(query_id: str) -> Optional[Dict[str, Any]]:
-    """Retrieve cached query results if still valid"""
-    cleanup_expired_cache()
-
-    if query_id in query_cache:
-        cache_data = query_cache[query_id]
-        if datetime.now() - cache_data["timestamp"] <= timedelta(minutes=settings.CACHE_TTL_MINUTES):
-            logger.info(f"Cache HIT for query_id: {query_id}")
-            return cache_data
+    """Retrieve cached query results if still valid (expired entries are evicted by the cache)"""
+    with _cache_lock:
+        cache_data = query_cache.get(query_id)
+        if cache_data is not None:
+            cache_stats["hits"] += 1
         else:
-            # Expired, remove it
-            del query_cache[query_id]
-            logger.info(f"Cache EXPIRED for query_id: {query_id}")
+            cache_stats["misses"] += 1
+
+    if cache_data is not None:
+        logger.info(f"Cache HIT for query_id: {query_id}")
+    else:
+        logger.info(f"Cache MISS for query_id: {query_id}")
+    return cache_data
 
-    logger.info(f"Cache MISS for query_id: {query_id}")
-    return None
+
+def get_cache_stats() -> Dict[str, int]:
+    """Get query cache size and hit/miss counters"""
+    with _cache_lock:
+        return {"entries": len(query_cache), **cache_stats}
 
 
 def cache_query_results(query_id: str, answer: str, mode: str,
                        filtered_docs: List[Dict], filters_applied: Optional[List[str]],
-                       statistics: Optional[Dict[str, Any]] = None):
-    """Cache query results for pagination"""
-    global query_cache
-
-    query_cache[query_id] = {
+                       statistics: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Cache query results for pagination
+    Documents are sorted by amount once here so every page is a plain slice
+    (expects documents passed through prepare_transactions)
+    """
+    cache_data = {
         "answer": answer,
         "mode": mode,
-        "filtered_docs": filtered_docs,
+        # Only the sorted copy is kept (pages are slices of it); total is the match count
+        "sorted_docs": sorted(filtered_docs, key=itemgetter("_amount_f"), reverse=True),
+        "total": len(filtered_docs),
         "filters_applied": filters_applied,
-        "statistics": statistics,
-        "timestamp": datetime.now()
+        "statistics": statistics
     }
+    with _cache_lock:
+        query_cache[query_id] = cache_data
     logger.info(f"Cached query results for query_id: {query_id} ({len(filtered_docs)} transactions)")
+    return cache_data
@@ -1,8 +1,14 @@
 
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, Union
+from datetime import datetime
+import atexit
 import logging
+import queue
+import threading
+import time
 
 try:
+    from sqlalchemy import func, insert, tuple_
     from app.db.database import SessionLocal, ChatHistory
     DB_AVAILABLE = True
 except ImportError:
@@ -10,6 +16,21 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Interactions are written in batches by a background thread: one multi-row INSERT and
+# one commit per batch instead of a session and commit per message
+CHAT_BATCH_SIZE = 128
+CHAT_BATCH_WAIT_SECONDS = 0.2
+# How long exit waits for the writer to save what it has already taken off the queue
+CHAT_FLUSH_TIMEOUT_SECONDS = 10.0
+
+# Queued to tell the writer to save its current batch and stop
+_STOP = object()
+
+_pending: "queue.Queue" = queue.Queue()
+_writer: Optional[threading.Thread] = None
+_writer_lock = threading.Lock()
+_exit_flush_registered = False
+
 
 def save_chat_interaction(
     user_id: str,
@@ -20,25 +41,86 @@ def save_chat_interaction(
     matching_transactions_count: Optional[int] = None,
     filters_applied: Optional[List[str]] = None
 ):
-
+    """Queue an interaction for the batched history writer (returns without waiting for the DB)"""
     if not DB_AVAILABLE:
         logger.warning("⚠️ Database not available - chat history not saved")
         return
 
+    _start_writer()
+    _pending.put({
+        "user_id": user_id,
+        "query_id": query_id,
+        "query": query,
+        "response": response,
+        "mode": mode,
+        "matching_transactions_count": matching_transactions_count,
+        "filters_applied": filters_applied,
+        "timestamp": datetime.utcnow()
+    })
+
+
+def flush_chat_history():
+    """Write every queued interaction now, stopping the writer (also runs at interpreter exit)"""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        # The writer may be holding a batch it already took off the queue: let it finish that
+        _pending.put(_STOP)
+        writer.join(CHAT_FLUSH_TIMEOUT_SECONDS)
+
+    while True:
+        rows, _ = _collect(wait=False)
+        if not rows:
+            return
+        _write_batch(rows)
+
+
+def _start_writer():
+    global _writer, _exit_flush_registered
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_run_writer, name="chat-history-writer", daemon=True)
+            _writer.start()
+            if not _exit_flush_registered:
+                atexit.register(flush_chat_history)
+                _exit_flush_registered = True
+
+
+def _collect(wait: bool) -> Tuple[List[Dict], bool]:
+    """
+    Take up to CHAT_BATCH_SIZE queued rows, optionally waiting for the first and then up to the batch window
+    Returns (rows, stop) where stop means the stop marker was taken
+    """
+    rows = []
+    deadline = time.monotonic() + CHAT_BATCH_WAIT_SECONDS
+
+    while len(rows) < CHAT_BATCH_SIZE:
+        try:
+            if not wait:
+                item = _pending.get_nowait()
+            elif not rows:
+                item = _pending.get()
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                item = _pending.get(timeout=remaining)
+        except queue.Empty:
+            break
+        if item is _STOP:
+            return rows, True
+        rows.append(item)
+
+    return rows, False
+
+
+def _write_batch(rows: List[Dict]):
     db = SessionLocal()
     try:
-        chat_entry = ChatHistory(
-            user_id=user_id,
-            query_id=query_id,
-            query=query,
-            response=response,
-            mode=mode,
-            matching_transactions_count=matching_transactions_count,
-            filters_applied=filters_applied
-        )
-        db.add(chat_entry)
+        db.execute(insert(ChatHistory), rows)
         db.commit()
-        logger.info(f"💬 CHAT: Saved interaction for user '{user_id}' (query_id: {query_id})")
+        logger.info(f"💬 CHAT: Saved {len(rows)} interaction(s)")
 
     except Exception as e:
         db.rollback()
@@ -47,11 +129,28 @@ def save_chat_interaction(
         db.close()
 
 
+def _run_writer():
+    while True:
+        rows, stop = _collect(wait=True)
+        if rows:
+            _write_batch(rows)
+        if stop:
+            return
+
+
 def get_chat_history(
     user_id: str,
     limit: int = 50,
-    offset: int = 0
+    before_ts: Optional[Union[str, datetime]] = None,
+    before_id: Optional[int] = None
 ) -> List[Dict]:
+    """
+    Newest-first chat history for a user
+    Pass the "timestamp" and "id" of the last entry already shown as before_ts/before_id to get the next page
+    (the isoformat timestamp string from a previous result is accepted as is)
+    """
+    if isinstance(before_ts, str):
+        before_ts = datetime.fromisoformat(before_ts)
 
     if not DB_AVAILABLE:
         logger.warning("⚠️ Database not available - returning empty history")
@@ -59,12 +158,17 @@ def get_chat_history(
 
     db = SessionLocal()
     try:
-        chats = db.query(ChatHistory)\
-            .filter_by(user_id=user_id)\
-            .order_by(ChatHistory.timestamp.desc())\
-            .limit(limit)\
-            .offset(offset)\
-            .all()
+        chats = db.query(ChatHistory).filter_by(user_id=user_id)
+        if before_ts is not None:
+            # Keyset pagination: seek on the (user_id, timestamp, id) index instead of skipping rows;
+            # id breaks ties so entries sharing a timestamp are neither skipped nor repeated
+            if before_id is not None:
+                chats = chats.filter(
+                    tuple_(ChatHistory.timestamp, ChatHistory.id) < tuple_(before_ts, before_id)
+                )
+            else:
+                chats = chats.filter(ChatHistory.timestamp < before_ts)
+        chats = chats.order_by(ChatHistory.timestamp.desc(), ChatHistory.id.desc()).limit(limit).all()
 
         history = [
             {
@@ -149,15 +253,12 @@ def get_chat_statistics(user_id: str) -> Dict:
         total_chats = db.query(ChatHistory).filter_by(user_id=user_id).count()
 
         # Get mode distribution
-        mode_stats = {}
-        modes = db.query(ChatHistory.mode)\
+        modes = db.query(ChatHistory.mode, func.count())\
             .filter_by(user_id=user_id)\
             .filter(ChatHistory.mode.isnot(None))\
+            .group_by(ChatHistory.mode)\
             .all()
-
-        for mode in modes:
-            mode_name = mode[0]
-            mode_stats[mode_name] = mode_stats.get(mode_name, 0) + 1
+        mode_stats = {mode_name: count for mode_name, count in modes}
 
         stats = {
             "total_interactions": total_chats,
@@ -2,17 +2,137 @@
 Data store for ingested transaction data
 """
 
+import threading
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 
+import numpy as np
+import pandas as pd
+
 # Storage for ingested context data
 ingested_data_store: Dict[str, Any] = {
     "transactions": [],
+    "soa": None,
+    "narration_signatures": None,
+    "formatted_by_id": {},
     "vectorstore": None,
     "langchain_docs": [],
     "last_updated": None
 }
 
+_signatures_lock = threading.Lock()
+
+# Characters that case-insensitive regexes match to ASCII letters but str.lower() does not
+_ASCII_FOLD = str.maketrans({"İ": "i", "ı": "i", "ſ": "s"})
+
+
+def _parse_amount(value: Any) -> float:
+    """Parse an amount field, treating missing or malformed values as 0"""
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def prepare_transactions(transactions: List[Dict]) -> List[Dict]:
+    """
+    Pre-parse fields used as sort keys so hot paths skip per-request parsing
+    Adds '_amount_f' (amount as float) to each transaction in place
+    """
+    for t in transactions:
+        t["_amount_f"] = _parse_amount(t.get("amount", 0))
+    return transactions
+
+
+def build_transaction_frame(transactions: List[Dict]) -> pd.DataFrame:
+    """
+    Build a columnar (structure-of-arrays) view of transactions
+    Row i describes transactions[i], so boolean masks over the frame map back to the dicts
+    Normalized columns (upper mode, lower account and narration, categorical type) serve filtering; *_label columns keep
+    the raw values used as group keys in analytical breakdowns
+    """
+    created_at = pd.Series([t.get("createdAt") or "" for t in transactions], dtype=object)
+    pk_gsi = pd.Series([t.get("pk_GSI_1") or "" for t in transactions], dtype=object)
+    dates = pd.to_datetime(created_at.str[:10], format="%Y-%m-%d", errors="coerce")
+    amounts = pd.Series([t.get("amount", 0) for t in transactions], dtype=object)
+    narration = pd.Series([t.get("narration") or "" for t in transactions], dtype=object)
+
+    amount = pd.to_numeric(amounts, errors="coerce").fillna(0.0).astype(float)
+
+    return pd.DataFrame({
+        "amount": amount,
+        # Whole paise, so amount filters compare integers
+        "amount_paise": np.rint(amount.to_numpy() * 100).astype(np.int64),
+        "year": dates.dt.year,
+        "month": dates.dt.month,
+        "mode": pd.Series(
+            [str(t.get("mode") or "").upper() for t in transactions], dtype=object
+        ),
+        "type": pk_gsi.astype("category"),
+        "type_label": pk_gsi.str.replace("TYPE#", "", regex=False),
+        "mode_label": pd.Series([t.get("mode", "UNKNOWN") for t in transactions], dtype=object),
+        "month_key": created_at.str[:7],
+        "created_at": created_at,
+        "txn_id": pd.Series([t.get("txnId", "") for t in transactions], dtype=object),
+        "account_id": pd.Series(
+            [str(t.get("accountId") or "").lower() for t in transactions], dtype=object
+        ),
+        "narration": narration,
+        "narration_lower": narration.str.lower()
+    })
+
+
+def get_transaction_frame(transactions: List[Dict]) -> pd.DataFrame:
+    """
+    Get the columnar view of transactions: the one built at ingest, or a fresh build for any other list
+    Request stages that need the frame of a non-ingested list more than once should build it once and pass it on
+    """
+    if transactions is ingested_data_store["transactions"] and ingested_data_store["soa"] is not None:
+        return ingested_data_store["soa"]
+    return build_transaction_frame(transactions)
+
+
+def narration_signature(text: str) -> int:
+    """
+    64-bit Bloom signature of the trigrams in text, ignoring case
+    If a word occurs in text, its signature bits are a subset of the text's
+    """
+    text = text.translate(_ASCII_FOLD).lower()
+    bits = 0
+    for i in range(len(text) - 2):
+        bits |= 1 << (hash(text[i:i + 3]) & 63)
+    return bits
+
+
+def get_narration_signatures(transactions: List[Dict]) -> Optional[np.ndarray]:
+    """
+    narration_signature of each ingested transaction, built on first use
+    None for any other list (a one-off scan is cheaper than building signatures)
+    """
+    soa = ingested_data_store["soa"]
+    if transactions is not ingested_data_store["transactions"] or soa is None:
+        return None
+
+    with _signatures_lock:
+        signatures = ingested_data_store["narration_signatures"]
+        if signatures is None:
+            signatures = np.fromiter(
+                (narration_signature(n) for n in soa["narration"]), dtype=np.uint64, count=len(soa)
+            )
+            if ingested_data_store["soa"] is soa:
+                ingested_data_store["narration_signatures"] = signatures
+        return signatures
+
+
+def get_formatted_transactions(transactions: List[Dict]) -> Dict[str, str]:
+    """
+    Get vector-store text by txnId for transactions formatted at ingest
+    Empty for any other list, so callers fall back to formatting themselves
+    """
+    if transactions is ingested_data_store["transactions"]:
+        return ingested_data_store["formatted_by_id"]
+    return {}
+
 
 def get_ingested_data() -> Dict[str, Any]:
     """Get the ingested data store"""
@@ -22,7 +142,12 @@ def get_ingested_data() -> Dict[str, Any]:
 def set_ingested_data(transactions: List[Dict], vectorstore, langchain_docs: List):
     """Set the ingested data"""
     global ingested_data_store
-    ingested_data_store["transactions"] = transactions
+    ingested_data_store["transactions"] = prepare_transactions(transactions)
+    ingested_data_store["soa"] = build_transaction_frame(transactions)
+    ingested_data_store["narration_signatures"] = None
+    ingested_data_store["formatted_by_id"] = {
+        doc.metadata["txnId"]: doc.page_content for doc in langchain_docs if doc.metadata.get("txnId")
+    }
     ingested_data_store["vectorstore"] = vectorstore
     ingested_data_store["langchain_docs"] = langchain_docs
     ingested_data_store["last_updated"] = datetime.now().isoformat()
@@ -32,6 +157,9 @@ def clear_ingested_data():
     """Clear the ingested data"""
     global ingested_data_store
     ingested_data_store["transactions"] = []
+    ingested_data_store["soa"] = None
+    ingested_data_store["narration_signatures"] = None
+    ingested_data_store["formatted_by_id"] = {}
     ingested_data_store["vectorstore"] = None
     ingested_data_store["langchain_docs"] = []
     ingested_data_store["last_updated"] = None
@@ -0,0 +1,107 @@
+"""
+Micro-batching for embedding requests
+Coalesces encode calls from concurrent requests into shared model forward passes
+"""
+
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    """
+    Collects (texts, future) pairs on a queue; when more than one is queued a
+    background thread waits up to max_wait_ms (or until max_batch texts are
+    queued), encodes everything in one call and hands each caller its slice of
+    the result. Requests arriving during an encode queue up for the next batch.
+
+    Callers run in worker threads (see run_in_threadpool), so encode() blocks.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], np.ndarray],
+        max_batch: int = settings.EMBEDDING_BATCH_SIZE,
+        max_wait_ms: int = settings.EMBEDDING_BATCH_WAIT_MS
+    ):
+        self._encode_fn = encode_fn
+        self._max_batch = max_batch
+        self._max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Encode texts, sharing the forward pass with concurrent callers"""
+        future: Future = Future()
+        self._queue.put((texts, future))
+        return future.result()
+
+    def _collect(self) -> List[tuple]:
+        """
+        Block for the first request, then gather more until the batch is full or the wait expires
+        A request with nothing else queued behind it is encoded straight away
+        """
+        batch = [self._queue.get()]
+        if self._queue.empty():
+            return batch
+        total = len(batch[0][0])
+        deadline = time.monotonic() + self._max_wait
+
+        while total < self._max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            total += len(item[0])
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            all_texts = [text for texts, _ in batch for text in texts]
+
+            try:
+                vectors = self._encode_fn(all_texts)
+            except Exception as e:
+                logger.error(f"Batched embedding failed: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            if len(batch) > 1:
+                logger.info(f"Coalesced {len(batch)} embedding requests ({len(all_texts)} texts)")
+
+            offset = 0
+            for texts, future in batch:
+                future.set_result(vectors[offset:offset + len(texts)])
+                offset += len(texts)
+
+
+# One batcher per embedding model, shared across requests
+_batchers: Dict[int, EmbeddingBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def get_embedding_batcher(embeddings_model) -> EmbeddingBatcher:
+    """Get (or start) the shared batcher for an embedding model"""
+    with _batchers_lock:
+        batcher = _batchers.get(id(embeddings_model))
+        if batcher is None:
+            batcher = EmbeddingBatcher(embeddings_model.encode_np)
+            _batchers[id(embeddings_model)] = batcher
+        return batcher
@@ -0,0 +1,75 @@
+"""
+Compiled aggregation kernels over transaction amounts
+Uses numba when it is installed, otherwise equivalent NumPy code
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+# Kernels are serial: they run inside threadpool workers, so requests already execute in
+# parallel, and numba's parallel backends are not safe to launch from many threads at once
+if NUMBA_AVAILABLE:
+
+    @njit(cache=True)
+    def _stats_kernel(amounts):
+        total = 0.0
+        high = amounts[0]
+        low = amounts[0]
+        for i in range(amounts.shape[0]):
+            value = amounts[i]
+            total += value
+            if value > high:
+                high = value
+            elif value < low:
+                low = value
+        return total, high, low
+
+    @njit(cache=True)
+    def _group_kernel(amounts, codes, n_groups):
+        counts = np.zeros(n_groups, dtype=np.int64)
+        sums = np.zeros(n_groups, dtype=np.float64)
+        for i in range(amounts.shape[0]):
+            counts[codes[i]] += 1
+            sums[codes[i]] += amounts[i]
+        return counts, sums
+
+
+def amount_stats(amounts: np.ndarray) -> Tuple[float, float, float, float]:
+    """Total, average, highest and lowest amount (all 0 for an empty array)"""
+    amounts = np.ascontiguousarray(amounts, dtype=np.float64)
+    if not amounts.size:
+        return 0.0, 0.0, 0.0, 0.0
+
+    if NUMBA_AVAILABLE:
+        total, high, low = _stats_kernel(amounts)
+    else:
+        total, high, low = amounts.sum(), amounts.max(), amounts.min()
+
+    return float(total), float(total) / amounts.size, float(high), float(low)
+
+
+def group_totals(amounts: np.ndarray, codes: np.ndarray, n_groups: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Count and amount total per group
+    codes[i] in [0, n_groups) is the group of amounts[i] (e.g. from pd.factorize)
+    """
+    amounts = np.ascontiguousarray(amounts, dtype=np.float64)
+    codes = np.ascontiguousarray(codes, dtype=np.intp)
+    if not amounts.size:
+        return np.zeros(n_groups, dtype=np.int64), np.zeros(n_groups, dtype=np.float64)
+
+    if NUMBA_AVAILABLE:
+        return _group_kernel(amounts, codes, n_groups)
+
+    return (
+        np.bincount(codes, minlength=n_groups),
+        np.bincount(codes, weights=amounts, minlength=n_groups)
+    )
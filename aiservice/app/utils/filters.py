@@ -3,18 +3,86 @@ Filter extraction and application utilities
 """
 
 import re
+import math
 import logging
-from typing import List, Dict, Any, Tuple
-from datetime import datetime
+from functools import lru_cache
+from typing import List, Dict, Any, Tuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.utils.data_store import get_transaction_frame, get_narration_signatures, narration_signature
 
 logger = logging.getLogger(__name__)
 
+# Month names (English and Hindi) for date filters
+_MONTHS = {
+    'january': 1, 'jan': 1, 'जनवरी': 1,
+    'february': 2, 'feb': 2, 'फरवरी': 2,
+    'march': 3, 'mar': 3, 'मार्च': 3,
+    'april': 4, 'apr': 4, 'अप्रैल': 4,
+    'may': 5, 'मई': 5,
+    'june': 6, 'jun': 6, 'जून': 6,
+    'july': 7, 'jul': 7, 'जुलाई': 7,
+    'august': 8, 'aug': 8, 'अगस्त': 8,
+    'september': 9, 'sept': 9, 'sep': 9, 'सितंबर': 9,
+    'october': 10, 'oct': 10, 'अक्टूबर': 10,
+    'november': 11, 'nov': 11, 'नवंबर': 11,
+    'december': 12, 'dec': 12, 'दिसंबर': 12
+}
+
+# Any month name as a whole word (a year may follow directly, e.g. "dec2023"),
+# with an optional year; longest names first so "january" wins over "jan"
+_MONTH_RE = re.compile(
+    r'\b(' + '|'.join(re.escape(name) for name in sorted(_MONTHS, key=len, reverse=True)) + r')'
+    r'(?![^\W\d_])(?:\s*(\d{4}))?'
+)
+
+_YEAR_BARE_RE = re.compile(r'\b(20\d{2})\b')
+_YEAR_RE = re.compile(r'^202[0-9]$')
+_ALL_NUMS_RE = re.compile(r'(\d+(?:,\d+)*(?:\.\d+)?)([kKlL]?)')
+# K = thousand, L = lakh
+_AMOUNT_MULTIPLIERS = {'': 1, 'k': 1000, 'l': 100000}
+_ACCOUNT_UUID_RE = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}')
+_ACCOUNT_KW_RE = re.compile(r'(?:account|acc|खाता)\s*(?:number|no|#)?\s*[:=]?\s*([a-zA-Z0-9\-]+)')
+_ABOVE_RE = re.compile(r'\b(?:above|greater than|more than|over|zyada)\b')
+_BELOW_RE = re.compile(r'\b(?:below|less than|under|kam)\b')
+_MODE_RE = re.compile(r'\b(upi|cash|neft|imps|rtgs|debit\s+card|credit\s+card)\b')
+_FULL_NAME_RE = re.compile(r'(?:by|from|to|with|se|ko|द्वारा)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)+)')
+_SINGLE_NAME_RE = re.compile(r'(?:by|from|to|with|se|ko|द्वारा)\s+([A-Z][a-z]+)')
+
+
+def _scan_amounts(question_lower: str) -> List[float]:
+    """Amounts in the question, in order, with K/L applied (bare 202x years are skipped)"""
+    amounts = []
+    for digits, suffix in _ALL_NUMS_RE.findall(question_lower):
+        digits = digits.replace(',', '')
+        if not suffix and _YEAR_RE.match(digits):
+            logger.debug(f"Skipping year: {digits}")
+            continue
+        amounts.append(float(digits) * _AMOUNT_MULTIPLIERS[suffix.lower()])
+    return amounts
+
 
-def extract_filters_from_query(question: str) -> Dict[str, Any]:
+def extract_filters_from_query(question: str, question_lower: Optional[str] = None) -> Dict[str, Any]:
     """
     Extract filters from natural language query
     Supports: amount, date, mode, type, account, person name
+    Pass question_lower when the caller already lowercased the question
+    Results are memoized per question; callers get their own copy
     """
+    if question_lower is None:
+        question_lower = question.lower()
+    filters = dict(_extract_filters_cached(question, question_lower))
+    logger.debug(f"Filter cache: {_extract_filters_cached.cache_info()}")
+    if filters['date_filter']:
+        filters['date_filter'] = dict(filters['date_filter'])
+    return filters
+
+
+# Keyed on the raw question: person-name extraction is case sensitive
+@lru_cache(maxsize=1024)
+def _extract_filters_cached(question: str, question_lower: str) -> Dict[str, Any]:
     filters = {
         "amount_above": None,
         "amount_below": None,
@@ -27,62 +95,21 @@ def extract_filters_from_query(question: str) -> Dict[str, Any]:
         "strict_name_match": False
     }
 
-    question_lower = question.lower()
-
-    # Date filters (month/year)
-    months_hindi = {
-        'january': 1, 'jan': 1, 'जनवरी': 1,
-        'february': 2, 'feb': 2, 'फरवरी': 2,
-        'march': 3, 'mar': 3, 'मार्च': 3,
-        'april': 4, 'apr': 4, 'अप्रैल': 4,
-        'may': 5, 'मई': 5,
-        'june': 6, 'jun': 6, 'जून': 6,
-        'july': 7, 'jul': 7, 'जुलाई': 7,
-        'august': 8, 'aug': 8, 'अगस्त': 8,
-        'september': 9, 'sep': 9, 'सितंबर': 9,
-        'october': 10, 'oct': 10, 'अक्टूबर': 10,
-        'november': 11, 'nov': 11, 'नवंबर': 11,
-        'december': 12, 'dec': 12, 'दिसंबर': 12
-    }
-
     # Extract month and year
-    for month_name, month_num in months_hindi.items():
-        if month_name in question_lower:
-            filters['date_filter'] = {'month': month_num}
-            year_match = re.search(rf'{month_name}\s*(\d{{4}})', question_lower)
-            if year_match:
-                filters['date_filter']['year'] = int(year_match.group(1))
-            break
+    month_match = _MONTH_RE.search(question_lower)
+    if month_match:
+        filters['date_filter'] = {'month': _MONTHS[month_match.group(1)]}
+        if month_match.group(2):
+            filters['date_filter']['year'] = int(month_match.group(2))
 
     # Year only
     if not filters['date_filter']:
-        year_match = re.search(r'\b(20\d{2})\b', question_lower)
+        year_match = _YEAR_BARE_RE.search(question_lower)
         if year_match:
             filters['date_filter'] = {'year': int(year_match.group(1))}
 
     # Amount filters - Avoid year confusion
-    all_numbers_raw = re.findall(r'\d+(?:,\d+)*(?:\.\d+)?[kKlL]?', question_lower)
-
-    amounts_processed = []
-    for num_str in all_numbers_raw:
-        num_clean = num_str.replace(',', '').lower()
-
-        # Skip if it's a year
-        if re.match(r'^202[0-9]$', num_clean):
-            logger.debug(f"Skipping year: {num_str}")
-            continue
-
-        # Convert K/L notation
-        try:
-            if 'k' in num_clean:
-                value = float(num_clean.replace('k', '')) * 1000
-            elif 'l' in num_clean:
-                value = float(num_clean.replace('l', '')) * 100000
-            else:
-                value = float(num_clean)
-            amounts_processed.append(value)
-        except ValueError:
-            continue
+    amounts_processed = _scan_amounts(question_lower)
 
     logger.debug(f"Processed amounts: {amounts_processed}")
 
@@ -96,23 +123,21 @@ def extract_filters_from_query(question: str) -> Dict[str, Any]:
         logger.info(f"Amount range: ₹{min_amt:,.2f} to ₹{max_amt:,.2f}")
 
     # Above/Greater than
-    elif any(word in question_lower for word in ["above", "greater than", "more than", "over", "zyada", "se zyada"]):
+    elif _ABOVE_RE.search(question_lower):
         if amounts_processed:
             filters['amount_above'] = amounts_processed[0]
             logger.info(f"Amount above: ₹{filters['amount_above']:,.2f}")
 
     # Below/Less than
-    elif any(word in question_lower for word in ["below", "less than", "under", "kam", "se kam"]):
+    elif _BELOW_RE.search(question_lower):
         if amounts_processed:
             filters['amount_below'] = amounts_processed[0]
             logger.info(f"Amount below: ₹{filters['amount_below']:,.2f}")
 
     # Transaction mode
-    modes = ['UPI', 'CASH', 'NEFT', 'IMPS', 'RTGS', 'DEBIT CARD', 'CREDIT CARD']
-    for mode in modes:
-        if mode.lower() in question_lower:
-            filters['mode'] = mode
-            break
+    mode_match = _MODE_RE.search(question_lower)
+    if mode_match:
+        filters['mode'] = ' '.join(mode_match.group(1).upper().split())
 
     # Transaction type
     if any(word in question_lower for word in ['credit', 'credited', 'क्रेडिट']):
@@ -121,23 +146,22 @@ def extract_filters_from_query(question: str) -> Dict[str, Any]:
         filters['type'] = 'DEBIT'
 
     # Account ID (UUID pattern)
-    account_pattern = r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'
-    account_match = re.search(account_pattern, question_lower)
+    account_match = _ACCOUNT_UUID_RE.search(question_lower)
     if account_match:
         filters['account_id'] = account_match.group(0)
     else:
-        account_keyword_match = re.search(r'(?:account|acc|खाता)\s*(?:number|no|#)?\s*[:=]?\s*([a-zA-Z0-9\-]+)', question_lower)
+        account_keyword_match = _ACCOUNT_KW_RE.search(question_lower)
         if account_keyword_match:
             filters['account_id'] = account_keyword_match.group(1)
 
     # Person name - STRICT MATCHING for full names
-    name_patterns = re.findall(r'(?:by|from|to|with|se|ko|द्वारा)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)+)', question)
+    name_patterns = _FULL_NAME_RE.findall(question)
     if name_patterns:
         filters['person_name'] = name_patterns[0].strip()
         filters['strict_name_match'] = True
         logger.info(f"STRICT name filter: '{filters['person_name']}'")
     else:
-        single_name = re.findall(r'(?:by|from|to|with|se|ko|द्वारा)\s+([A-Z][a-z]+)', question)
+        single_name = _SINGLE_NAME_RE.findall(question)
         if single_name:
             filters['person_name'] = single_name[0].strip()
             filters['strict_name_match'] = False
@@ -146,117 +170,202 @@ def extract_filters_from_query(question: str) -> Dict[str, Any]:
     return filters
 
 
-def apply_filters(documents: List[Dict], filters: Dict, question: str) -> Tuple[List[Dict], List[str]]:
-    """
-    Apply extracted filters to documents
-    Returns: (filtered_docs, filter_descriptions)
-    """
-    filtered = documents.copy()
-    descriptions = []
+@lru_cache(maxsize=128)
+def _strict_name_regex(name: str) -> re.Pattern:
+    """Whole-word, whitespace-tolerant, case-insensitive pattern for a full name"""
+    return re.compile(
+        r'\b' + r'\s+'.join(re.escape(word) for word in name.split()) + r'\b',
+        re.IGNORECASE
+    )
 
-    logger.info(f"Applying filters to {len(documents)} transactions...")
 
-    # Date filter
-    if filters.get('date_filter'):
-        date_f = filters['date_filter']
-        new_filtered = []
-        for d in filtered:
-            date_str = d.get('createdAt', '')
-            if date_str:
-                try:
-                    date_obj = datetime.strptime(date_str[:10], '%Y-%m-%d')
-                    match = True
-                    if 'year' in date_f and date_obj.year != date_f['year']:
-                        match = False
-                    if 'month' in date_f and date_obj.month != date_f['month']:
-                        match = False
-                    if match:
-                        new_filtered.append(d)
-                except:
-                    pass
-        filtered = new_filtered
+_MONTH_ABBREVIATIONS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+                        'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+
+def _describe_filters(filters: Dict) -> List[str]:
+    """Human-readable description of each active filter"""
+    descriptions = []
+
+    date_f = filters.get('date_filter')
+    if date_f:
         if 'month' in date_f and 'year' in date_f:
-            month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
-                          'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-            descriptions.append(f"Date: {month_names[date_f['month']-1]} {date_f['year']}")
+            descriptions.append(f"Date: {_MONTH_ABBREVIATIONS[date_f['month']-1]} {date_f['year']}")
         elif 'year' in date_f:
             descriptions.append(f"Year: {date_f['year']}")
-        logger.info(f"Date filter: {len(filtered)} transactions")
 
-    # Mode filter
     if filters.get('mode'):
-        mode = filters['mode']
-        filtered = [d for d in filtered if d.get('mode', d.get('txnMode', '')).upper() == mode.upper()]
-        descriptions.append(f"Mode: {mode}")
-        logger.info(f"Mode filter: {len(filtered)} {mode} transactions")
+        descriptions.append(f"Mode: {filters['mode']}")
 
-    # Type filter
     if filters.get('type'):
-        txn_type = filters['type']
-        filtered = [d for d in filtered if txn_type in d.get('pk_GSI_1', '')]
-        descriptions.append(f"Type: {txn_type}")
-        logger.info(f"Type filter: {len(filtered)} {txn_type} transactions")
+        descriptions.append(f"Type: {filters['type']}")
 
-    # Amount filters
     if filters.get('amount_range'):
         min_amt, max_amt = filters['amount_range']
-        filtered = [d for d in filtered if min_amt <= float(d.get('amount', 0)) <= max_amt]
         descriptions.append(f"Amount: ₹{min_amt:,.2f} - ₹{max_amt:,.2f}")
-        logger.info(f"Amount range: {len(filtered)} transactions")
+    elif filters.get('amount_above'):
+        descriptions.append(f"Amount above: ₹{filters['amount_above']:,.2f}")
+    elif filters.get('amount_below'):
+        descriptions.append(f"Amount below: ₹{filters['amount_below']:,.2f}")
+
+    if filters.get('account_id'):
+        descriptions.append(f"Account: {filters['account_id']}")
+
+    if filters.get('person_name'):
+        name = filters['person_name']
+        if filters.get('strict_name_match', False):
+            descriptions.append(f"EXACT name: '{name}'")
+        else:
+            descriptions.append(f"Person: '{name}'")
+
+    return descriptions
+
+
+# Column filter stages AND their condition into a boolean row mask in place
+
+def _filter_account(frame: pd.DataFrame, filters: Dict, mask: np.ndarray):
+    acc_id = filters.get('account_id')
+    if acc_id:
+        mask &= frame["account_id"].to_numpy() == acc_id.lower()
+        logger.info(f"Account filter: {mask.sum()} transactions")
+
+
+def _filter_type(frame: pd.DataFrame, filters: Dict, mask: np.ndarray):
+    txn_type = filters.get('type')
+    if txn_type:
+        # Categorical column: the substring test runs once per distinct type
+        mask &= frame["type"].str.contains(txn_type, regex=False).to_numpy(dtype=bool)
+        logger.info(f"Type filter: {mask.sum()} {txn_type} transactions")
+
+
+def _filter_mode(frame: pd.DataFrame, filters: Dict, mask: np.ndarray):
+    mode = filters.get('mode')
+    if mode:
+        mask &= frame["mode"].to_numpy() == mode.upper()
+        logger.info(f"Mode filter: {mask.sum()} {mode} transactions")
+
+
+def _filter_date(frame: pd.DataFrame, filters: Dict, mask: np.ndarray):
+    date_f = filters.get('date_filter')
+    if date_f:
+        if 'year' in date_f:
+            mask &= frame["year"].to_numpy() == date_f['year']
+        if 'month' in date_f:
+            mask &= frame["month"].to_numpy() == date_f['month']
+        logger.info(f"Date filter: {mask.sum()} transactions")
+
+
+_PAISE_MIN, _PAISE_MAX = int(np.iinfo(np.int64).min), int(np.iinfo(np.int64).max)
+
+
+def _to_paise(amount: float) -> Tuple[int, int]:
+    """
+    (floor, ceil) of a rupee amount in whole paise, clamped to int64
+    Float noise is snapped first (0.29 * 100 is 28.999...), so exact paise give floor == ceil
+    """
+    paise = amount * 100
+    nearest = round(paise)
+    if abs(paise - nearest) < 1e-6:
+        low = high = nearest
+    else:
+        low, high = math.floor(paise), math.ceil(paise)
+    return min(max(low, _PAISE_MIN), _PAISE_MAX), min(max(high, _PAISE_MIN), _PAISE_MAX)
+
+
+def _filter_amount(frame: pd.DataFrame, filters: Dict, mask: np.ndarray):
+    # Integer compares against the paise column; for whole-paise amounts,
+    # > floor(t) / < ceil(t) select exactly what > t / < t would
+    paise = frame["amount_paise"].to_numpy()
+
+    if filters.get('amount_range'):
+        min_amt, max_amt = filters['amount_range']
+        mask &= (paise >= _to_paise(min_amt)[1]) & (paise <= _to_paise(max_amt)[0])
+        logger.info(f"Amount range: {mask.sum()} transactions")
 
     elif filters.get('amount_above'):
         threshold = filters['amount_above']
-        amount_filtered = [d for d in filtered if float(d.get('amount', 0)) > threshold]
-        filtered = amount_filtered
+        mask &= paise > _to_paise(threshold)[0]
 
         # Validation
-        if filtered:
-            min_amount = min([float(d.get('amount', 0)) for d in filtered])
+        if mask.any():
+            min_amount = frame["amount"].to_numpy()[mask].min()
             logger.info(f"Min amount: ₹{min_amount:,.2f} (should be > ₹{threshold:,.2f})")
 
-        descriptions.append(f"Amount above: ₹{threshold:,.2f}")
-        logger.info(f"Amount filter: {len(filtered)} transactions above ₹{threshold:,.2f}")
+        logger.info(f"Amount filter: {mask.sum()} transactions above ₹{threshold:,.2f}")
 
     elif filters.get('amount_below'):
         threshold = filters['amount_below']
-        filtered = [d for d in filtered if float(d.get('amount', 0)) < threshold]
-        descriptions.append(f"Amount below: ₹{threshold:,.2f}")
-        logger.info(f"Amount filter: {len(filtered)} transactions below ₹{threshold:,.2f}")
+        mask &= paise < _to_paise(threshold)[1]
+        logger.info(f"Amount filter: {mask.sum()} transactions below ₹{threshold:,.2f}")
 
-    # Account filter
-    if filters.get('account_id'):
-        acc_id = filters['account_id']
-        account_filtered = [d for d in filtered
-                           if d.get('accountId', d.get('accountNumber', '')).lower() == acc_id.lower()]
-        filtered = account_filtered
-        descriptions.append(f"Account: {acc_id}")
-        logger.info(f"Account filter: {len(filtered)} transactions")
-
-    # Person name filter - STRICT MATCHING
-    if filters.get('person_name'):
-        name = filters['person_name']
-        strict_match = filters.get('strict_name_match', False)
-
-        if strict_match:
-            person_filtered = []
-            for d in filtered:
-                narration = d.get('narration', '')
-                name_words = name.split()
-                if len(name_words) >= 2:
-                    pattern = r'\b' + r'\s+'.join(re.escape(word) for word in name_words) + r'\b'
-                    if re.search(pattern, narration, re.IGNORECASE):
-                        person_filtered.append(d)
-                else:
-                    if name.lower() in narration.lower():
-                        person_filtered.append(d)
-
-            filtered = person_filtered
-            descriptions.append(f"EXACT name: '{name}'")
-            logger.info(f"STRICT name filter: {len(filtered)} transactions")
-        else:
-            person_filtered = [d for d in filtered if name.lower() in d.get('narration', '').lower()]
-            filtered = person_filtered
-            descriptions.append(f"Person: '{name}'")
-            logger.info(f"Loose name filter: {len(filtered)} transactions")
 
-    return filtered, descriptions
+# Most selective first, so an empty result skips the remaining stages sooner
+_COLUMN_FILTERS = (_filter_account, _filter_type, _filter_mode, _filter_date, _filter_amount)
+
+
+def _filter_person(frame: pd.DataFrame, documents: List[Dict], filters: Dict, indices: np.ndarray) -> np.ndarray:
+    """Person name filter - STRICT MATCHING (free text, so it only runs on rows left by the column filters)"""
+    name = filters['person_name']
+    strict_match = filters.get('strict_name_match', False)
+    name_words = name.split()
+
+    # Cheap prefilter: drop rows whose narration lacks any trigram of the name's words
+    signatures = get_narration_signatures(documents)
+    if signatures is not None:
+        needle = 0
+        for word in name_words:
+            needle |= narration_signature(word)
+        needle = np.uint64(needle)
+        indices = indices[(signatures[indices] & needle) == needle]
+
+    if strict_match and len(name_words) >= 2:
+        pattern = _strict_name_regex(name)
+        narrations = frame["narration"].to_numpy()
+        indices = np.array([i for i in indices if pattern.search(narrations[i])], dtype=np.intp)
+    else:
+        name_lower = name.lower()
+        narrations_lower = frame["narration_lower"].to_numpy()
+        indices = np.array([i for i in indices if name_lower in narrations_lower[i]], dtype=np.intp)
+
+    if strict_match:
+        logger.info(f"STRICT name filter: {len(indices)} transactions")
+    else:
+        logger.info(f"Loose name filter: {len(indices)} transactions")
+    return indices
+
+
+def filter_transaction_indices(
+    documents: List[Dict],
+    filters: Dict,
+    frame: Optional[pd.DataFrame] = None
+) -> Tuple[np.ndarray, List[str]]:
+    """
+    Apply extracted filters over the columnar view of the documents (frame, if the caller already has it)
+    Returns: (indices of matching documents in original order, filter_descriptions)
+    """
+    if frame is None:
+        frame = get_transaction_frame(documents)
+    mask = np.ones(len(frame), dtype=bool)
+
+    logger.info(f"Applying filters to {len(documents)} transactions...")
+
+    for stage in _COLUMN_FILTERS:
+        stage(frame, filters, mask)
+        if not mask.any():
+            break
+
+    indices = np.flatnonzero(mask)
+
+    if filters.get('person_name') and len(indices):
+        indices = _filter_person(frame, documents, filters, indices)
+
+    return indices, _describe_filters(filters)
+
+
+def apply_filters(documents: List[Dict], filters: Dict, question: str) -> Tuple[List[Dict], List[str]]:
+    """
+    Apply extracted filters to documents
+    Returns: (filtered_docs, filter_descriptions)
+    """
+    indices, descriptions = filter_transaction_indices(documents, filters)
+    return [documents[i] for i in indices], descriptions
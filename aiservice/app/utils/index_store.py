@@ -0,0 +1,163 @@
+"""
+On-disk copy of the ingested vector store
+Lets a restarted worker (or a repeat ingest of the same data) skip re-embedding every transaction
+
+Each save goes to its own version directory; the CURRENT file names the live one and is
+swapped atomically, so readers never see files from two different saves
+
+The docstore is a pickle, and unpickling runs arbitrary code: FAISS_INDEX_PATH must only be
+writable by this service, and nothing is saved or loaded unless FAISS_ALLOW_DANGEROUS_DESERIALIZATION is set
+"""
+
+import os
+import uuid
+import shutil
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import faiss
+import orjson
+import xxhash
+from langchain_core.documents import Document
+from langchain_community.vectorstores import FAISS
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "index"
+TRANSACTIONS_FILE = "transactions.json"
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+VERSION_PREFIX = "v-"
+
+_io_lock = threading.Lock()
+
+
+def transactions_hash(transactions: List[Dict]) -> str:
+    """Content hash identifying a set of transactions (key order independent)"""
+    return xxhash.xxh3_128_hexdigest(orjson.dumps(transactions, option=orjson.OPT_SORT_KEYS))
+
+
+def persistence_enabled() -> bool:
+    """
+    Whether ingests are saved and restored: saving an index that can never be loaded back
+    would only cost I/O and leave transactions on disk, so both settings are required
+    """
+    return bool(settings.FAISS_INDEX_PATH) and settings.FAISS_ALLOW_DANGEROUS_DESERIALIZATION
+
+
+def _current_version(target: Path) -> Optional[str]:
+    """Name of the live version directory, if any"""
+    try:
+        return (target / CURRENT_FILE).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def save_index(
+    path: str,
+    vectorstore: FAISS,
+    transactions: List[Dict],
+    content_hash: str
+):
+    """
+    Write the index, its docstore, the transactions and a manifest to a new version
+    directory under path, then point CURRENT at it and remove the version it replaced
+    """
+    target = Path(path)
+    version = f"{VERSION_PREFIX}{uuid.uuid4().hex}"
+    version_dir = target / version
+
+    with _io_lock:
+        target.mkdir(parents=True, exist_ok=True)
+        published = False
+        try:
+            vectorstore.save_local(str(version_dir), INDEX_NAME)
+            (version_dir / TRANSACTIONS_FILE).write_bytes(orjson.dumps(transactions))
+            (version_dir / MANIFEST_FILE).write_bytes(orjson.dumps({
+                "content_hash": content_hash,
+                "embedding_model": settings.EMBEDDING_MODEL,
+                "transactions": len(transactions),
+                "saved_at": datetime.now().isoformat()
+            }))
+
+            # Swap the pointer in one rename (atomic across processes too)
+            previous = _current_version(target)
+            fd, tmp_pointer = tempfile.mkstemp(dir=target)
+            try:
+                with os.fdopen(fd, "w") as f:
+                    f.write(version)
+                os.replace(tmp_pointer, target / CURRENT_FILE)
+            except BaseException:
+                Path(tmp_pointer).unlink(missing_ok=True)
+                raise
+            published = True
+        finally:
+            if not published:
+                shutil.rmtree(version_dir, ignore_errors=True)
+
+        if previous and previous != version:
+            shutil.rmtree(target / previous, ignore_errors=True)
+
+    logger.info(f"💾 Saved vector index for {len(transactions)} transactions to {version_dir}")
+
+
+def load_index(
+    path: str,
+    embeddings_model,
+    content_hash: Optional[str] = None
+) -> Optional[Tuple[FAISS, List[Document], Optional[List[Dict]]]]:
+    """
+    Load the saved vector store
+    With content_hash: only if it matches the saved data (transactions are not re-read)
+    Without: the last saved ingest, including its transactions
+    Returns None when nothing usable is saved (or loading pickles is not allowed)
+    """
+    if not settings.FAISS_ALLOW_DANGEROUS_DESERIALIZATION:
+        logger.warning(
+            "Not loading the saved vector index: its docstore is a pickle; "
+            "set FAISS_ALLOW_DANGEROUS_DESERIALIZATION=true if FAISS_INDEX_PATH is trusted"
+        )
+        return None
+
+    target = Path(path)
+    with _io_lock:
+        version = _current_version(target)
+        if version is None:
+            return None
+        version_dir = target / version
+
+        try:
+            manifest = orjson.loads((version_dir / MANIFEST_FILE).read_bytes())
+        except FileNotFoundError:
+            return None
+
+        if manifest.get("embedding_model") != settings.EMBEDDING_MODEL:
+            return None
+        if content_hash is not None and manifest.get("content_hash") != content_hash:
+            return None
+
+        try:
+            vectorstore = FAISS.load_local(str(version_dir), embeddings_model, INDEX_NAME)
+            transactions = None
+            if content_hash is None:
+                transactions = orjson.loads((version_dir / TRANSACTIONS_FILE).read_bytes())
+        except Exception as e:
+            logger.warning(f"Saved vector index at {version_dir} is unreadable: {e}")
+            return None
+
+    index = vectorstore.index
+    if isinstance(index, faiss.IndexIVF):
+        index.nprobe = settings.FAISS_IVF_NPROBE
+
+    langchain_docs = [
+        vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]) for i in range(index.ntotal)
+    ]
+
+    logger.info(f"📂 Loaded vector index for {index.ntotal} transactions from {version_dir}")
+    return vectorstore, langchain_docs, transactions
@@ -0,0 +1,26 @@
+"""
+Response language detection
+"""
+
+import re
+from typing import Literal
+
+Language = Literal["hi", "hinglish", "en"]
+
+# Any Devanagari character means the user wrote in Hindi
+_DEVANAGARI_RE = re.compile(r'[\u0900-\u097F]')
+
+# Common Hindi words written in Roman script
+_HINGLISH_RE = re.compile(r'\b(mujhe|saari|dikhao|batao|kya|ki|se|ko)\b', re.IGNORECASE)
+
+
+def detect_language(question: str) -> Language:
+    """
+    Detect the language to answer in
+    Returns: 'hi' (Devanagari), 'hinglish' (Roman script with Hindi words) or 'en'
+    """
+    if _DEVANAGARI_RE.search(question):
+        return "hi"
+    if _HINGLISH_RE.search(question):
+        return "hinglish"
+    return "en"
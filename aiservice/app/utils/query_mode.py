@@ -4,97 +4,206 @@ Query mode detection utilities
 
 import re
 import logging
-from typing import List, Dict
+from functools import lru_cache
+from typing import List, Dict, Optional, Set, Tuple
+
+import numpy as np
+
+from app.utils.data_store import get_transaction_frame
+from app.utils.fast_stats import amount_stats
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Vector-search prompts that need the whole dataset instead of top-k retrieval
+_ANALYTICAL_KEYWORDS = (
+    'summarize', 'summarise', 'summary', 'analyze', 'analyse',
+    'overview', 'insights', 'patterns', 'trends'
+)
+
+_COUNTING_PATTERNS = [
+    re.compile(pattern) for pattern in (
+        r'\b(how many|kitne|count|total)\s+.*?transaction',
+        r'transaction.*?\b(how many|kitne|count|total)',
+        r'\b(कितने|कितनी)\s+.*?(transaction|ट्रांज)',
+        r'(transaction|ट्रांज).*?\b(कितने|कितनी)',
+        r'\bnumber of\s+transaction',
+    )
+]
+
+# detect_query_mode also treats a bare "how many" as counting
+_MODE_COUNTING_RES = _COUNTING_PATTERNS + [re.compile(r'\b(how|kitne)\s+many\b')]
+
+_ACCOUNT_RE = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}')
+_ACCOUNT_KW_RE = re.compile(r'\b(account|acc|खाता)\s*(?:number|no|#)?\b')
+
+# "account number" etc. are identifiers, not statistics
+_EXCLUDE_RES = [
+    re.compile(pattern) for pattern in (
+        r'account\s*number',
+        r'transaction\s*number',
+        r'reference\s*number',
+    )
+]
+
+_YEAR_RE = re.compile(r'\b(20\d{2})\b')
+_MONTH_RE = re.compile(r'\b(january|february|march|april|may|june|july|august|september|october|november|december)\b')
+
+# Keyword groups, matched as substrings of the lowercased question
+_KEYWORD_GROUPS = {
+    # Turns an account query into a full listing
+    "account_listing": ('transaction', 'saari', 'all', 'list', 'dikhao'),
+    # Pure calculation queries
+    "stats": (
+        'total amount', 'sum of', 'average amount', 'count of',
+        'how many transactions', 'kitne transactions'
+    ),
+    # Filtered lists
+    "full_scan": (
+        'all', 'saari', 'sabhi', 'sab', 'every', 'show me', 'dikhao',
+        'list', 'display', 'between', 'above', 'below', 'largest', 'smallest'
+    ),
+    "transaction": ('transaction',),
+    # General analytical/summarization queries
+    "analytical": (
+        'summarize', 'summarise', 'summary', 'analyze', 'analyse', 'analysis',
+        'insights', 'patterns', 'trends', 'overview', 'explain', 'tell me about',
+        'what happened', 'describe', 'understand', 'help me', 'guide', 'advice',
+        'recommend', 'suggest', 'why', 'how', 'when', 'where', 'what',
+        'batao', 'samjhao', 'bataiye', 'explain karo', 'kya hua'
+    ),
+    "whole_dataset": _ANALYTICAL_KEYWORDS,
+}
+
+
+def _keyword_categories() -> Dict[str, frozenset]:
+    """Map each keyword to every group it belongs to"""
+    categories: Dict[str, set] = {}
+    for group, keywords in _KEYWORD_GROUPS.items():
+        for keyword in keywords:
+            categories.setdefault(keyword, set()).add(group)
+    return {keyword: frozenset(groups) for keyword, groups in categories.items()}
+
+
+_KEYWORD_CATEGORIES = _keyword_categories()
+
+# One automaton finds every keyword in a single pass over the question
+if AHOCORASICK_AVAILABLE:
+    _KEYWORD_AUTOMATON = ahocorasick.Automaton()
+    for _keyword, _groups in _KEYWORD_CATEGORIES.items():
+        _KEYWORD_AUTOMATON.add_word(_keyword, _groups)
+    _KEYWORD_AUTOMATON.make_automaton()
+
+
+def _keyword_hits(text_lower: str) -> Set[str]:
+    """Groups with at least one keyword occurring in text_lower"""
+    hits = set()
+    if AHOCORASICK_AVAILABLE:
+        for _, groups in _KEYWORD_AUTOMATON.iter(text_lower):
+            hits |= groups
+    else:
+        for keyword, groups in _KEYWORD_CATEGORIES.items():
+            if keyword in text_lower:
+                hits |= groups
+    return hits
 
-def detect_query_mode(question: str, documents: List[Dict]) -> str:
+
+def detect_query_mode(question: str, documents: List[Dict], question_lower: Optional[str] = None) -> str:
     """
     Detect the best mode for answering the query
     Returns: VECTOR_SEARCH, SMART_FULL, or STATISTICAL
     """
-    question_lower = question.lower()
+    if question_lower is None:
+        question_lower = question.lower()
+    mode, reason = _detect_query_mode_cached(question_lower)
+    logger.debug(f"Query mode cache: {_detect_query_mode_cached.cache_info()}")
+
+    # Logged here rather than in the cached function so cache hits are logged too
+    if reason == "counting":
+        logger.info("Detected counting query - using VECTOR_SEARCH with ALL data awareness")
+    elif reason == "analytical":
+        logger.info("Detected analytical query - using VECTOR_SEARCH with LLM")
+    return mode
+
 
+# Only the lowercased question decides the mode (documents are not consulted)
+# Returns (mode, reason), reason naming the rule that picked the mode where it is worth logging
+@lru_cache(maxsize=1024)
+def _detect_query_mode_cached(question_lower: str) -> Tuple[str, Optional[str]]:
     # PRIORITY 1: Counting queries - needs ALL transactions
     # Check for "how many", "kitne", "count", "total transactions" type queries
-    counting_patterns = [
-        r'\b(how many|kitne|count|total)\s+.*?transaction',  # how many transactions
-        r'transaction.*?\b(how many|kitne|count|total)',      # transactions how many
-        r'\b(कितने|कितनी)\s+.*?(transaction|ट्रांज)',        # Hindi: kitne transactions
-        r'(transaction|ट्रांज).*?\b(कितने|कितनी)',            # transactions kitne
-        r'\b(how|kitne)\s+many\b',                             # how many
-        r'\bnumber of\s+transaction',                          # number of transactions
-    ]
-
-    for pattern in counting_patterns:
-        if re.search(pattern, question_lower):
-            logger.info("Detected counting query - using VECTOR_SEARCH with ALL data awareness")
-            return "VECTOR_SEARCH"  # Will be handled with comprehensive context
+    if any(pattern.search(question_lower) for pattern in _MODE_COUNTING_RES):
+        return "VECTOR_SEARCH", "counting"  # Will be handled with comprehensive context
+
+    hits = _keyword_hits(question_lower)
 
     # PRIORITY 2: Check for account number queries
-    account_pattern = r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'
-    has_account = bool(re.search(account_pattern, question_lower))
-    has_account_keyword = bool(re.search(r'\b(account|acc|खाता)\s*(?:number|no|#)?\b', question_lower))
+    has_account = bool(_ACCOUNT_RE.search(question_lower))
+    has_account_keyword = bool(_ACCOUNT_KW_RE.search(question_lower))
 
-    if (has_account or has_account_keyword) and any(word in question_lower for word in ['transaction', 'saari', 'all', 'list', 'dikhao']):
-        return "SMART_FULL"
+    if (has_account or has_account_keyword) and "account_listing" in hits:
+        return "SMART_FULL", None
 
     # PRIORITY 3: Statistical keywords (ONLY for pure stats, not analysis)
-    exclude_patterns = [
-        r'account\s*number',
-        r'transaction\s*number',
-        r'reference\s*number',
-    ]
-    is_excluded = any(re.search(pattern, question_lower) for pattern in exclude_patterns)
+    is_excluded = any(pattern.search(question_lower) for pattern in _EXCLUDE_RES)
 
     if not is_excluded:
         # Only trigger stats mode for pure calculation queries
-        stats_keywords = [
-            'total amount', 'sum of', 'average amount', 'count of',
-            'how many transactions', 'kitne transactions'
-        ]
-        if any(kw in question_lower for kw in stats_keywords):
-            return "STATISTICAL"
+        if "stats" in hits:
+            return "STATISTICAL", None
 
     # PRIORITY 4: Full scan keywords (for filtered lists)
-    full_scan_keywords = [
-        'all', 'saari', 'sabhi', 'sab', 'every', 'show me', 'dikhao',
-        'list', 'display', 'between', 'above', 'below', 'largest', 'smallest'
-    ]
-    if any(kw in question_lower for kw in full_scan_keywords):
-        return "SMART_FULL"
+    if "full_scan" in hits:
+        return "SMART_FULL", None
 
     # PRIORITY 5: Date/time period queries
-    has_year = bool(re.search(r'\b(20\d{2})\b', question_lower))
-    has_month = bool(re.search(r'\b(january|february|march|april|may|june|july|august|september|october|november|december)\b', question_lower))
+    has_year = bool(_YEAR_RE.search(question_lower))
+    has_month = bool(_MONTH_RE.search(question_lower))
 
-    if (has_year or has_month) and 'transaction' in question_lower:
-        return "SMART_FULL"
+    if (has_year or has_month) and "transaction" in hits:
+        return "SMART_FULL", None
 
     # PRIORITY 6: General analytical/summarization queries
-    analytical_keywords = [
-        'summarize', 'summarise', 'summary', 'analyze', 'analyse', 'analysis',
-        'insights', 'patterns', 'trends', 'overview', 'explain', 'tell me about',
-        'what happened', 'describe', 'understand', 'help me', 'guide', 'advice',
-        'recommend', 'suggest', 'why', 'how', 'when', 'where', 'what',
-        'batao', 'samjhao', 'bataiye', 'explain karo', 'kya hua'
-    ]
-    if any(kw in question_lower for kw in analytical_keywords):
-        logger.info("Detected analytical query - using VECTOR_SEARCH with LLM")
-        return "VECTOR_SEARCH"
+    if "analytical" in hits:
+        return "VECTOR_SEARCH", "analytical"
 
     # Default to VECTOR_SEARCH for open-ended questions
-    return "VECTOR_SEARCH"
+    return "VECTOR_SEARCH", None
 
 
-def calculate_statistics(documents: List[Dict], filters: Dict) -> Dict[str, float]:
-    """Calculate statistics on filtered documents"""
-    from app.utils.filters import apply_filters
+def is_analytical_or_counting(prompt: str, prompt_lower: Optional[str] = None) -> bool:
+    """
+    Check if a vector-search prompt is an analytical or counting query
+    Such queries are answered from the whole dataset instead of top-k retrieval
+    """
+    if prompt_lower is None:
+        prompt_lower = prompt.lower()
+    if "whole_dataset" in _keyword_hits(prompt_lower):
+        return True
+    return any(pattern.search(prompt_lower) for pattern in _COUNTING_PATTERNS)
+
+
+def calculate_statistics(
+    documents: List[Dict],
+    filters: Dict,
+    amounts: Optional[np.ndarray] = None
+) -> Dict[str, float]:
+    """
+    Calculate statistics on filtered documents
+    amounts are the filtered amounts, if the caller has already applied the filters
+    """
+    if amounts is None:
+        from app.utils.filters import filter_transaction_indices
 
-    filtered_docs, _ = apply_filters(documents, filters, "")
+        indices, _ = filter_transaction_indices(documents, filters)
+        amounts = get_transaction_frame(documents)["amount"].to_numpy()[indices]
 
-    if not filtered_docs:
+    if len(amounts) == 0:
         return {
             "count": 0,
             "total": 0.0,
@@ -103,12 +212,13 @@ def calculate_statistics(documents: List[Dict], filters: Dict) -> Dict[str, floa
             "min": 0.0
         }
 
-    amounts = [float(d.get("amount", 0)) for d in filtered_docs]
+    # One fused pass for all four reductions
+    total, average, highest, lowest = amount_stats(amounts)
 
     return {
-        "count": len(filtered_docs),
-        "total": sum(amounts),
-        "average": sum(amounts) / len(amounts) if amounts else 0,
-        "max": max(amounts) if amounts else 0,
-        "min": min(amounts) if amounts else 0
+        "count": len(amounts),
+        "total": total,
+        "average": average,
+        "max": highest,
+        "min": lowest
     }
@@ -1,6 +1,7 @@
 """
 Migration script to update existing database schema
-Makes vectorstore_data column nullable
+Makes vectorstore_data column nullable, stores transactions as JSONB
+and indexes chat history by user and time
 """
 
 import os
@@ -11,6 +12,9 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Rows cleared per transaction in step 2
+BATCH_SIZE = 1000
+
 if not DATABASE_URL:
     print("❌ DATABASE_URL not found in .env")
     exit(1)
@@ -36,19 +40,58 @@ try:
 
         print("\n2. Setting existing vectorstore_data to empty string...")
 
-        # Clear existing large data
-        result = conn.execute(text("""
-            UPDATE user_data 
-            SET vectorstore_data = ''
-            WHERE vectorstore_data IS NOT NULL
+        # Clear existing large data in batches, skipping rows that are already empty,
+        # so each commit (and the WAL it writes) stays bounded
+        rows_updated = 0
+        while True:
+            # One-shot migration: don't wait for each batch to be flushed to disk
+            conn.execute(text("SET LOCAL synchronous_commit = off"))
+            result = conn.execute(text("""
+                UPDATE user_data
+                SET vectorstore_data = ''
+                WHERE ctid IN (
+                    SELECT ctid FROM user_data
+                    WHERE vectorstore_data IS NOT NULL AND vectorstore_data <> ''
+                    LIMIT :batch_size
+                )
+            """), {"batch_size": BATCH_SIZE})
+            conn.commit()
+
+            if result.rowcount == 0:
+                break
+            rows_updated += result.rowcount
+
+        print(f"   ✅ Cleared vectorstore_data for {rows_updated} user(s)")
+
+        print("\n3. Converting transactions column to JSONB...")
+
+        # JSONB is stored pre-parsed and supports GIN indexing
+        conn.execute(text("""
+            ALTER TABLE user_data
+            ALTER COLUMN transactions TYPE JSONB USING transactions::jsonb
+        """))
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_user_data_transactions
+            ON user_data USING gin (transactions)
         """))
 
         conn.commit()
-        rows_updated = result.rowcount
-        print(f"   ✅ Cleared vectorstore_data for {rows_updated} user(s)")
+        print("   ✅ transactions is now JSONB with a GIN index")
+
+        print("\n4. Indexing chat history by user and time...")
+
+        # (timestamp, id) is the keyset pagination cursor; replaces the earlier (user_id, timestamp) index
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_chat_history_user_timestamp_id
+            ON chat_history (user_id, timestamp, id)
+        """))
+        conn.execute(text("DROP INDEX IF EXISTS ix_chat_history_user_timestamp"))
+
+        conn.commit()
+        print("   ✅ Composite (user_id, timestamp, id) index created")
 
-        print("\n3. Verifying changes...")
-        result = conn.execute(text("SELECT user_id, LENGTH(vectorstore_data) as vs_length FROM user_data"))
+        print("\n5. Verifying changes...")
+        result = conn.execute(text("SELECT user_id, OCTET_LENGTH(vectorstore_data) as vs_length FROM user_data"))
 
         for row in result:
             print(f"   User: {row[0]}, Vectorstore size: {row[1]} bytes")
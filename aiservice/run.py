@@ -11,5 +11,6 @@ if __name__ == "__main__":
         "app.main:app",
         host=settings.HOST,
         port=settings.PORT,
-        reload=settings.RELOAD
+        reload=settings.RELOAD,
+        workers=1 if settings.RELOAD else settings.WORKERS
     )